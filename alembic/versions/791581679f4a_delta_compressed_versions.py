@@ -0,0 +1,101 @@
+"""Delta-compressed version storage
+
+Revision ID: 791581679f4a
+Revises: ae6a4371cc0b
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '791581679f4a'
+down_revision: Union[str, None] = 'ae6a4371cc0b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The delta format and keyframe spacing as of this revision, copied here so the data this
+# migration writes does not depend on the application code present at upgrade time.
+KEYFRAME_INTERVAL = 20
+
+
+def _make_delta(base, target):
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, base_lines, target_lines).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(target_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode())
+
+
+def _apply_delta(base, delta):
+    base_lines = base.splitlines(keepends=True)
+    return "".join(
+        "".join(base_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in json.loads(zlib.decompress(delta))
+    )
+
+
+versions = sa.table(
+    'versions',
+    sa.column('id', sa.Integer),
+    sa.column('note_id', sa.Integer),
+    sa.column('version_number', sa.Integer),
+    sa.column('content_snapshot', sa.Text),
+    sa.column('delta', sa.LargeBinary),
+)
+
+
+def _note_ids(bind):
+    return [row[0] for row in bind.execute(sa.select(versions.c.note_id).distinct())]
+
+
+def _history(bind, note_id):
+    return bind.execute(
+        sa.select(versions.c.id, versions.c.version_number, versions.c.content_snapshot, versions.c.delta)
+        .where(versions.c.note_id == note_id)
+        .order_by(versions.c.version_number)
+    ).all()
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('versions') as batch_op:
+        batch_op.add_column(sa.Column('delta', sa.LargeBinary(), nullable=True))
+        batch_op.alter_column('content_snapshot', existing_type=sa.Text(), nullable=True)
+
+    # Re-encode each note's history one note at a time: keyframes stay as full text, the
+    # versions in between become deltas against the most recent keyframe.
+    bind = op.get_bind()
+    for note_id in _note_ids(bind):
+        keyframe_number, keyframe = None, None
+        for row in _history(bind, note_id):
+            if keyframe is not None and row.version_number - keyframe_number < KEYFRAME_INTERVAL:
+                delta = _make_delta(keyframe, row.content_snapshot)
+                if len(delta) < len(row.content_snapshot.encode()):
+                    bind.execute(versions.update().where(versions.c.id == row.id).values(content_snapshot=None, delta=delta))
+                    continue
+            keyframe_number, keyframe = row.version_number, row.content_snapshot
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for note_id in _note_ids(bind):
+        keyframe = None
+        for row in _history(bind, note_id):
+            if row.content_snapshot is not None:
+                keyframe = row.content_snapshot
+            else:
+                bind.execute(versions.update().where(versions.c.id == row.id).values(content_snapshot=_apply_delta(keyframe, row.delta)))
+
+    with op.batch_alter_table('versions') as batch_op:
+        batch_op.alter_column('content_snapshot', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('delta')
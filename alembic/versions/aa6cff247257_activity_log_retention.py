@@ -0,0 +1,109 @@
+"""Activity-log rollups, note/timestamp index and monthly partitions on PostgreSQL
+
+Revision ID: aa6cff247257
+Revises: c85734048b45
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aa6cff247257'
+down_revision: Union[str, None] = 'c85734048b45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions are created up to this many months ahead; the maintenance job adds later ones.
+MONTHS_AHEAD = 2
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_postgres():
+    """Rebuild activity_logs as a table partitioned by month on timestamp.
+
+    Partitioned tables need the partition key in every unique constraint, so the primary key
+    becomes (id, timestamp); ids still come from the same sequence. Rows outside the monthly
+    partitions land in the default partition.
+    """
+    bind = op.get_bind()
+    op.execute("ALTER TABLE activity_logs RENAME TO activity_logs_old")
+    op.execute("ALTER INDEX activity_logs_pkey RENAME TO activity_logs_old_pkey")
+    op.execute("ALTER INDEX ix_activity_logs_id RENAME TO ix_activity_logs_old_id")
+    op.execute(
+        "CREATE TABLE activity_logs ("
+        " id integer NOT NULL DEFAULT nextval('activity_logs_id_seq'),"
+        " note_id integer NOT NULL REFERENCES notes (id),"
+        " user_id integer NOT NULL REFERENCES users (id),"
+        " action varchar NOT NULL,"
+        " timestamp timestamp without time zone NOT NULL,"
+        " PRIMARY KEY (id, timestamp)"
+        ") PARTITION BY RANGE (timestamp)"
+    )
+    op.execute("ALTER SEQUENCE activity_logs_id_seq OWNED BY activity_logs.id")
+    op.execute("CREATE TABLE activity_logs_default PARTITION OF activity_logs DEFAULT")
+
+    first = bind.execute(sa.text("SELECT MIN(timestamp) FROM activity_logs_old")).scalar()
+    month = (first or datetime.utcnow()).date().replace(day=1)
+    last = _add_months(datetime.utcnow().date().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(f"CREATE TABLE activity_logs_p{month:%Y%m} PARTITION OF activity_logs "
+                   f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')")
+        month = _add_months(month, 1)
+
+    op.execute("INSERT INTO activity_logs (id, note_id, user_id, action, timestamp) "
+               "SELECT id, note_id, user_id, action, timestamp FROM activity_logs_old")
+    op.execute("DROP TABLE activity_logs_old")
+    op.create_index('ix_activity_logs_id', 'activity_logs', ['id'], unique=False)
+
+
+def _unpartition_postgres():
+    op.execute("ALTER TABLE activity_logs RENAME TO activity_logs_partitioned")
+    op.execute("ALTER INDEX activity_logs_pkey RENAME TO activity_logs_partitioned_pkey")
+    op.execute("ALTER INDEX ix_activity_logs_id RENAME TO ix_activity_logs_partitioned_id")
+    op.execute(
+        "CREATE TABLE activity_logs ("
+        " id integer NOT NULL DEFAULT nextval('activity_logs_id_seq') PRIMARY KEY,"
+        " note_id integer NOT NULL REFERENCES notes (id),"
+        " user_id integer NOT NULL REFERENCES users (id),"
+        " action varchar NOT NULL,"
+        " timestamp timestamp without time zone NOT NULL"
+        ")"
+    )
+    op.execute("ALTER SEQUENCE activity_logs_id_seq OWNED BY activity_logs.id")
+    op.execute("INSERT INTO activity_logs (id, note_id, user_id, action, timestamp) "
+               "SELECT id, note_id, user_id, action, timestamp FROM activity_logs_partitioned")
+    op.execute("DROP TABLE activity_logs_partitioned")  # drops its partitions too
+    op.create_index('ix_activity_logs_id', 'activity_logs', ['id'], unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_postgres()
+    op.create_index('ix_activity_logs_note_timestamp', 'activity_logs', ['note_id', 'timestamp', 'id'], unique=False)
+    op.create_table(
+        'activity_log_rollups',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('note_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'note_id', 'user_id', 'action'),
+    )
+    op.create_index('ix_activity_log_rollups_note_day', 'activity_log_rollups', ['note_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activity_log_rollups_note_day', table_name='activity_log_rollups')
+    op.drop_table('activity_log_rollups')
+    op.drop_index('ix_activity_logs_note_timestamp', table_name='activity_logs')
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_postgres()
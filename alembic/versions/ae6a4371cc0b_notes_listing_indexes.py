@@ -0,0 +1,28 @@
+"""Notes listing indexes
+
+Revision ID: ae6a4371cc0b
+Revises: a8dad2bf48b8
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ae6a4371cc0b'
+down_revision: Union[str, None] = 'a8dad2bf48b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_notes_owner_updated', 'notes', ['owner_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_note_collaborators_user_note', 'note_collaborators', ['user_id', 'note_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_note_collaborators_user_note', table_name='note_collaborators')
+    op.drop_index('ix_notes_owner_updated', table_name='notes')
@@ -0,0 +1,111 @@
+"""Per-note version counter and unique version numbers
+
+Revision ID: c85734048b45
+Revises: 791581679f4a
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c85734048b45'
+down_revision: Union[str, None] = '791581679f4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The delta format and keyframe spacing as of this revision, copied here so the data this
+# migration writes does not depend on the application code present at upgrade time.
+KEYFRAME_INTERVAL = 20
+
+
+def _make_delta(base, target):
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, base_lines, target_lines).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(target_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode())
+
+
+def _apply_delta(base, delta):
+    base_lines = base.splitlines(keepends=True)
+    return "".join(
+        "".join(base_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in json.loads(zlib.decompress(delta))
+    )
+
+
+versions = sa.table(
+    'versions',
+    sa.column('id', sa.Integer),
+    sa.column('note_id', sa.Integer),
+    sa.column('version_number', sa.Integer),
+    sa.column('content_snapshot', sa.Text),
+    sa.column('delta', sa.LargeBinary),
+)
+
+
+def _renumber(bind, note_id):
+    """Give a history with duplicate numbers the numbers 1..n in (version_number, id) order.
+
+    Deltas reference the latest keyframe numbered strictly below them, which changes under
+    renumbering, so the history is decoded first and re-encoded with the new numbers.
+    """
+    rows = bind.execute(
+        sa.select(versions.c.id, versions.c.version_number, versions.c.content_snapshot, versions.c.delta)
+        .where(versions.c.note_id == note_id)
+        .order_by(versions.c.version_number, versions.c.id)
+    ).all()
+    keyframes, contents = [], []
+    for row in rows:
+        if row.content_snapshot is not None:
+            contents.append(row.content_snapshot)
+            keyframes.append((row.version_number, row.content_snapshot))
+        else:
+            base = [content for number, content in keyframes if number < row.version_number][-1]
+            contents.append(_apply_delta(base, row.delta))
+
+    keyframe_number, keyframe = None, None
+    for number, (row, content) in enumerate(zip(rows, contents), start=1):
+        values = {"version_number": number, "content_snapshot": content, "delta": None}
+        if keyframe is not None and number - keyframe_number < KEYFRAME_INTERVAL:
+            delta = _make_delta(keyframe, content)
+            if len(delta) < len(content.encode()):
+                values.update(content_snapshot=None, delta=delta)
+        if values["delta"] is None:
+            keyframe_number, keyframe = number, content
+        bind.execute(versions.update().where(versions.c.id == row.id).values(**values))
+
+
+def upgrade() -> None:
+    op.add_column('notes', sa.Column('version_count', sa.Integer(), server_default='0', nullable=False))
+
+    bind = op.get_bind()
+    duplicated = bind.execute(
+        sa.select(versions.c.note_id).group_by(versions.c.note_id, versions.c.version_number)
+        .having(sa.func.count() > 1).distinct()
+    ).scalars().all()
+    for note_id in duplicated:
+        _renumber(bind, note_id)
+
+    op.execute(
+        "UPDATE notes SET version_count = "
+        "(SELECT COALESCE(MAX(version_number), 0) FROM versions WHERE versions.note_id = notes.id)"
+    )
+    op.create_index('uq_versions_note_version', 'versions', ['note_id', 'version_number'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_versions_note_version', table_name='versions')
+    with op.batch_alter_table('notes') as batch_op:
+        batch_op.drop_column('version_count')
@@ -0,0 +1,29 @@
+"""Edit coalescing window on notes
+
+Revision ID: d4f5c72355cd
+Revises: e5018991ee14
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f5c72355cd'
+down_revision: Union[str, None] = 'e5018991ee14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notes', sa.Column('last_editor_id', sa.Integer(), nullable=True))
+    op.add_column('notes', sa.Column('coalesce_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('notes') as batch_op:
+        batch_op.drop_column('coalesce_until')
+        batch_op.drop_column('last_editor_id')
@@ -0,0 +1,27 @@
+"""Count of versions removed by compaction, part of the version-history ETag
+
+Revision ID: e5018991ee14
+Revises: aa6cff247257
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5018991ee14'
+down_revision: Union[str, None] = 'aa6cff247257'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notes', sa.Column('history_pruned', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('notes') as batch_op:
+        batch_op.drop_column('history_pruned')
@@ -1,9 +1,77 @@
-from passlib.context import CryptContext
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from app.config import settings
+from app.utils.lazy import Lazy
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@functools.cache
+def _pwd_context():
+    # passlib and bcrypt are imported on the first hash, not at app import.
+    from passlib.context import CryptContext
+    # min_rounds makes needs_update() flag hashes made with a lower work factor, so they are
+    # upgraded transparently on the next successful login.
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=settings.bcrypt_rounds,
+        bcrypt__min_rounds=settings.bcrypt_rounds,
+    )
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return _pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_update(plain_password: str, hashed_password: str):
+    """Return (valid, new_hash); new_hash is set when the stored hash should be replaced."""
+    return _pwd_context().verify_and_update(plain_password, hashed_password)
+
+class PasswordHasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool so login bursts cannot starve request threads.
+
+    At most `max_pending` calls may be queued or running; beyond that `run` raises
+    PasswordHasherBusy immediately instead of waiting.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the server process already runs threads.
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        # BoundedSemaphore keeps its free count in _value.
+        return {"workers": self.workers, "max_pending": self.max_pending,
+                "in_flight": self.max_pending - self._slots._value, "rejected": self.rejected}
+
+password_hasher = Lazy(lambda: PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending))
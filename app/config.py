@@ -1,13 +1,90 @@
+from functools import lru_cache
+from typing import Optional
 from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     database_url: str
+    async_mode: bool = False  # serve requests from an asyncpg/aiosqlite engine
+    async_database_url: Optional[str] = None  # defaults to database_url with the async driver
+    db_pool_size: int = 5  # per worker process
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # seconds; -1 disables
+    db_pool_pre_ping: bool = True
+    db_pgbouncer: bool = False  # a transaction-pooling PgBouncer sits in front of Postgres
+    database_replica_urls: str = ""  # comma-separated read replicas for GET requests
+    replica_read_your_writes: float = 5.0  # seconds a user's reads stay on the primary after they commit a write
+    replica_health_interval: float = 5.0
+    replica_max_lag: float = 0.0  # seconds of replication lag before a replica is skipped; 0 ignores lag
+    slow_query_threshold: float = 0.2  # seconds; slower statements are logged to app.sql, 0 disables
+    request_metrics: bool = True  # per-request query counting, Server-Timing header and /metrics histograms
+    request_slowest_queries: int = 3  # statements kept per request for the app.requests log record
+    metrics_token: Optional[str] = None  # bearer token required by /metrics; unset leaves them open (internal network only)
+    web_bind: str = "0.0.0.0:8000"  # python -m app.server
+    web_workers: int = 0  # 0 starts one per available CPU
+    web_graceful_timeout: int = 30  # seconds in-flight requests get on shutdown or reload
+    web_keepalive: int = 5
+    web_max_requests: int = 0  # requests before a worker is replaced (with 10% jitter); 0 never
+    web_preload: bool = True  # import the app in the master and fork the workers from it
+    web_forwarded_allow_ips: str = "127.0.0.1"  # proxies trusted for X-Forwarded-* headers
+    db_create_all: bool = False  # create missing tables at startup (development); otherwise run `alembic upgrade head`
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    token_embed_user_id: bool = False  # put `uid` in tokens so authentication needs no users query; a deleted user's tokens then work until they expire
+    principal_cache_size: int = 10000
+    principal_cache_ttl: float = 60.0
+    acl_cache_size: int = 50000
+    acl_cache_ttl: float = 0.0  # seconds a confirmed access is trusted per worker (a revoked collaborator keeps it that long); 0 disables
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2  # processes per server worker
+    password_hash_max_pending: int = 32  # queued + running hashes before rejecting with 503
     origins_str: str = "http://localhost,http://localhost:3000" 
+    version_keyframe_interval: int = 20
+    version_cache_size: int = 256
+    version_conflict_retries: int = 3
+    edit_coalesce_window: float = 0.0  # seconds; 0 gives every PUT /notes/{id} its own version
+    version_keep_last: int = 0  # newest versions always kept per note; 0 disables version retention
+    version_hourly_days: int = 2  # older versions are thinned to one per hour for this many days,
+    version_daily_days: int = 30  # then one per day up to this age, then one per week
+    version_max_age_days: int = 0  # versions older than this are removed; 0 keeps the weekly ones
+    version_compaction_batch: int = 100  # notes per batch
+    version_compaction_interval: float = 3600.0  # 0 disables the in-process job
+    diff_cache_size: int = 512  # computed version diffs per worker
+    read_cache_backend: str = "local"  # "local" (per worker) or "redis" (shared)
+    read_cache_max_bytes: int = 64 * 1024 * 1024  # local backend, per worker; 0 disables the read cache
+    read_cache_url: Optional[str] = None  # redis backend, e.g. redis://localhost:6379/0
+    read_cache_ttl: float = 300.0  # redis backend; bounds the life of entries nothing reads any more (0 keeps them until evicted)
+    activity_log_queue_size: int = 10000
+    activity_log_batch_size: int = 500
+    activity_log_flush_interval: float = 1.0
+    activity_log_overflow: str = "drop"  # "drop" or "block"
+    activity_log_block_timeout: float = 0.05
+    activity_log_retention_days: int = 90  # raw rows; 0 keeps them forever. Rollups are kept.
+    activity_log_prune_batch: int = 5000
+    activity_log_partition_months_ahead: int = 2
+    activity_log_maintenance_interval: float = 3600.0  # 0 disables the in-process job
+    stream_queue_size: int = 100
+    stream_keepalive: float = 15.0
+    import_max_line_bytes: int = 16 * 1024 * 1024  # one NDJSON record of POST /notes/import
+    import_max_bytes: int = 1024 * 1024 * 1024  # whole import body, after gzip decompression
     class Config:
         env_file = ".env"
     @property
     def origins(self) -> list[str]:
         return [origin.strip() for origin in self.origins_str.split(",")]
-settings = Settings()
\ No newline at end of file
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+class _LazySettings:
+    """Reads the environment on first attribute access rather than at import."""
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+settings = _LazySettings()
\ No newline at end of file
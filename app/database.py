@@ -1,16 +1,161 @@
-from sqlalchemy import create_engine
+import threading
+from contextlib import contextmanager
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.config import settings
+from app.utils.instrumentation import instrument_engine
+from app.utils.pool import PoolMetrics, instrumented
 
-engine = create_engine(settings.database_url, echo=False)  
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def engine_options(url: str, pool_class, metrics: PoolMetrics) -> dict:
+    url = make_url(url)
+    options = {"echo": False}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options  # in-memory SQLite keeps its single-connection pool
+    if settings.db_pgbouncer:
+        # PgBouncer owns the pooling; hold no idle connections and avoid server-side
+        # prepared statements, which do not survive transaction pooling.
+        options["poolclass"] = instrumented(NullPool, metrics)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+    options.update(
+        poolclass=instrumented(pool_class, metrics),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    return options
+
+pool_metrics = {"sync": PoolMetrics()}
+
+def async_database_url() -> str:
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+
+# Engines are created on first use (or by init_engines() in the app lifespan), so importing the
+# app opens no pool and needs no database. The sync engine always exists once used: background
+# workers and migrations use it in both modes.
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine():
+    engine = _engines.get("sync")
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get("sync")
+            if engine is None:
+                engine = create_engine(settings.database_url, **engine_options(settings.database_url, QueuePool, pool_metrics["sync"]))
+                instrument_engine(engine)
+                _engines["sync"] = engine
+    return engine
+
+def get_async_engine():
+    engine = _engines.get("async")
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get("async")
+            if engine is None:
+                pool_metrics.setdefault("async", PoolMetrics())
+                engine = create_async_engine(async_database_url(), **engine_options(async_database_url(), AsyncAdaptedQueuePool, pool_metrics["async"]))
+                instrument_engine(engine.sync_engine)
+                _engines["async"] = engine
+    return engine
+
+def init_engines():
+    get_engine()
+    if settings.async_mode:
+        get_async_engine()
+
+async def dispose_engines():
+    with _engines_lock:
+        engines = dict(_engines)
+        _engines.clear()
+    if "async" in engines:
+        await engines["async"].dispose()
+    if "sync" in engines:
+        engines["sync"].dispose()
+
+def __getattr__(name):
+    # `from app.database import engine` keeps working, creating the engine at that point.
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _replica(session: Session, clause):
+    # Set by app.utils.replicas.route for read-only requests; writes always go to the primary.
+    replica = session.info.get("replica")
+    if replica is None or session._flushing or (clause is not None and clause.is_dml):
+        return None
+    return replica
+
+class _SyncSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.bind is None:
+            return _replica(self, clause) or get_engine()
+        return super().get_bind(mapper, clause, **kwargs)
+
+class _AsyncBackedSession(Session):
+    # The sync session inside AsyncSession; AsyncSession runs it on the async engine.
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return _replica(self, clause) or get_async_engine().sync_engine
+
+# Objects are serialized after the session work returns, so they must not expire on commit.
+SessionLocal = sessionmaker(class_=_SyncSession, autocommit=False, autoflush=False, expire_on_commit=False)
+AsyncSessionLocal = async_sessionmaker(sync_session_class=_AsyncBackedSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
+async def get_db():
+    # ASYNC_MODE is read per request, not at import, like the engines themselves.
+    if settings.async_mode:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await run_in_threadpool(db.close)
+
+async def run_db(db, fn, *args, **kwargs):
+    """Run `fn(session, *args, **kwargs)` without blocking the event loop.
+
+    Handlers keep their ORM code synchronous. In async mode it runs on the async engine via
+    AsyncSession.run_sync; in sync mode it runs on the threadpool as before.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+@contextmanager
+def advisory_lock(bind, key: int):
+    """Try a PostgreSQL session-level advisory lock; yields whether it was taken.
+
+    The lock lives on a connection of its own, so it is held across the commits of the job it
+    guards. Other databases run one job at a time anyway and always get it.
+    """
+    if bind.dialect.name != "postgresql":
+        yield True
+        return
+    with bind.engine.connect() as connection:
+        locked = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+        connection.commit()
+        try:
+            yield locked
+        finally:
+            if locked:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                connection.commit()
@@ -1,18 +1,66 @@
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.auth.jwt import verify_token
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config import settings
+from app.database import get_db, run_db
+from app.auth.jwt import decode_token
 from app.models.user import User
+from app.utils.cache import LRUCache
+from app.utils.lazy import Lazy
+from app.utils.replicas import route
 
-security = HTTPBearer()
+security = HTTPBearer(auto_error=False)  # a missing token is a 401, not HTTPBearer's 403
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+# Token subject -> {"id", "username"}. A hit (or a token carrying `uid`) skips the users query.
+principal_cache = Lazy(lambda: LRUCache(settings.principal_cache_size, ttl=settings.principal_cache_ttl))
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_principal(mapper, connection, target):
+    principal_cache.pop(target.username)
+
+def _get_user(db: Session, username: str):
+    user = db.query(User).filter(User.username == username).first()
+    # End the read transaction so the connection goes back to the pool while the request
+    # waits for its handler to be scheduled.
+    db.commit()
+    return user
+
+def _attach(db, principal: dict) -> User:
+    # Put a persistent User into this session's identity map without querying; columns other
+    # than id/username load lazily if a handler touches them.
+    user = User(id=principal["id"], username=principal["username"])
+    make_transient_to_detached(user)
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    return session.merge(user, load=False)
+
+async def get_current_user(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(security), db=Depends(get_db)):
+    if credentials is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
     token = credentials.credentials
-    username = verify_token(token)
-    if username is None:
+    payload = decode_token(token)
+    if payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
\ No newline at end of file
+    username = payload["sub"]
+    principal = principal_cache.get(username)
+    if principal is None:
+        if payload.get("uid") is not None:
+            principal = {"id": payload["uid"], "username": username}
+        else:
+            user = await run_db(db, _get_user, username)
+            if user is None:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+            principal = {"id": user.id, "username": user.username}
+        principal_cache.set(username, principal)
+    route(db, request.method, principal["id"])
+    return _attach(db, principal)
+
+async def require_metrics_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    # A static operator token rather than a user login, so scrapers need no account.
+    expected = settings.metrics_token
+    if expected and (credentials is None or not secrets.compare_digest(credentials.credentials.encode(), expected.encode())):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
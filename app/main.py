@@ -1,38 +1,61 @@
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, notes, versions
-from app.database import engine, Base  
+from fastapi.responses import ORJSONResponse
+from app.routers import auth, notes, versions, metrics
+from app.database import Base, dispose_engines, get_engine, init_engines
+from app.auth.utils import password_hasher
+from app.utils.activity import activity_writer
+from app.utils.activity_retention import activity_maintenance
+from app.utils.version_retention import version_compaction
+from app.utils.replicas import replica_set
+from app.utils.events import hub
 from app.utils.errors import add_exception_handlers
+from app.utils.instrumentation import RequestMetricsMiddleware
 from app.config import settings
 
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Notes API with Version History", version="1.0.0")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.origins, 
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema comes from Alembic migrations; DB_CREATE_ALL is a development shortcut.
+    init_engines()
+    if settings.db_create_all:
+        await run_in_threadpool(Base.metadata.create_all, bind=get_engine())
+    activity_writer.start()
+    activity_maintenance.start()
+    version_compaction.start()
+    replica_set.start()
+    hub.start(asyncio.get_running_loop())
+    yield
+    hub.stop()
+    replica_set.stop()
+    version_compaction.stop()
+    activity_maintenance.stop()
+    activity_writer.stop()
+    password_hasher.shutdown()
+    await replica_set.dispose()
+    await dispose_engines()
+
+# orjson renders the validated response data several times faster than the json module
+app = FastAPI(title="Notes API with Version History", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+class _CORSMiddleware(CORSMiddleware):
+    # Starlette builds the middleware stack on startup, so ORIGINS_STR is read then, not at import.
+    def __init__(self, app):
+        super().__init__(app, allow_origins=settings.origins, allow_credentials=True,
+                         allow_methods=["*"], allow_headers=["*"])
+
+app.add_middleware(_CORSMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
 
 add_exception_handlers(app)
 
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(notes.router, prefix="/notes", tags=["Notes"])
 app.include_router(versions.router, prefix="/versions", tags=["Versions"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Notes API"}
-
-from fastapi import HTTPException
-from fastapi.responses import JSONResponse
-
-@app.exception_handler(HTTPException)
-async def http_exception_handler(request: Request, exc: HTTPException):
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={"detail": exc.detail},
-    )
\ No newline at end of file
@@ -1,14 +1,31 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
 
 class ActivityLog(Base):
     __tablename__ = "activity_logs"
+    # On PostgreSQL the migration makes this table partitioned by month on `timestamp`
+    # (see app/utils/activity_retention.py); elsewhere it stays a plain table.
+    __table_args__ = (
+        Index("ix_activity_logs_note_timestamp", "note_id", "timestamp", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     note_id = Column(Integer, ForeignKey("notes.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     action = Column(String, nullable=False)  # e.g., 'view', 'edit', 'restore'
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     note = relationship("Note")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+class ActivityLogRollup(Base):
+    """Daily event counts per note, user and action; outlives the raw rows it summarizes."""
+    __tablename__ = "activity_log_rollups"
+    __table_args__ = (
+        Index("ix_activity_log_rollups_note_day", "note_id", "day"),
+    )
+    day = Column(Date, primary_key=True)
+    note_id = Column(Integer, primary_key=True)  # no FK: rollups are kept for deleted notes
+    user_id = Column(Integer, primary_key=True)
+    action = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False)
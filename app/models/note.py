@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Index, DDL, event
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -7,16 +7,54 @@ note_collaborators = Table(
     'note_collaborators',
     Base.metadata,
     Column('note_id', Integer, ForeignKey('notes.id'), primary_key=True),
-    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True)
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Index('ix_note_collaborators_user_note', 'user_id', 'note_id'),
 )
 
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        # Keyset pagination of a user's notes by (updated_at, id).
+        Index("ix_notes_owner_updated", "owner_id", "updated_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(String, nullable=False)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    version_count = Column(Integer, default=0, server_default="0", nullable=False)  # last version_number handed out
+    history_pruned = Column(Integer, default=0, server_default="0", nullable=False)  # versions removed by compaction
+    # Edit coalescing: PUTs by last_editor_id before coalesce_until update the note in place
+    last_editor_id = Column(Integer, nullable=True)
+    coalesce_until = Column(DateTime, nullable=True)
     owner = relationship("User")
-    collaborators = relationship("User", secondary=note_collaborators, backref="shared_notes")
\ No newline at end of file
+    collaborators = relationship("User", secondary=note_collaborators, backref="shared_notes")
+    versions = relationship("Version", back_populates="note", cascade="all, delete-orphan")
+
+# Full-text search index. PostgreSQL maintains the GIN expression index itself; on SQLite an
+# external-content FTS5 table is kept in sync with `notes` by triggers. Both are mirrored in the
+# Alembic migration and used by app/utils/search.py.
+PG_SEARCH_VECTOR = "(setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', content), 'B'))"
+
+PG_SEARCH_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_notes_search ON notes USING gin ({PG_SEARCH_VECTOR})",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+    "title, content, content='notes', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS notes_fts_ai AFTER INSERT ON notes BEGIN "
+    "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS notes_fts_ad AFTER DELETE ON notes BEGIN "
+    "INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS notes_fts_au AFTER UPDATE OF title, content ON notes BEGIN "
+    "INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+for statement in PG_SEARCH_DDL:
+    event.listen(Note.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Note.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Note.__table__, "before_drop", DDL("DROP TABLE IF EXISTS notes_fts").execute_if(dialect="sqlite"))
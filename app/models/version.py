@@ -1,15 +1,19 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Text, LargeBinary, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Version(Base):
     __tablename__ = "versions"
+    __table_args__ = (
+        Index("uq_versions_note_version", "note_id", "version_number", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     note_id = Column(Integer, ForeignKey("notes.id"), nullable=False)
     version_number = Column(Integer, nullable=False)
-    content_snapshot = Column(Text, nullable=False)
+    content_snapshot = Column(Text, nullable=True)  # full text on keyframes, see app/utils/versioning.py
+    delta = Column(LargeBinary, nullable=True)  # compressed delta against the previous keyframe
     editor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -1,32 +1,57 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, run_db
 from app.schemas.user import UserCreate, UserLogin, UserOut
 from app.models.user import User
-from app.auth.utils import verify_password, hash_password
+from app.auth.utils import hash_password, password_hasher, verify_and_update
 from app.auth.jwt import create_access_token
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+# bcrypt runs in the password hasher's process pool, outside run_db, so it never holds a
+# session, a request thread or the event loop.
+
+def _check_available(db: Session, user: UserCreate):
     if db.query(User).filter(User.username == user.username).first():
         raise HTTPException(status_code=400, detail="Username already registered")
     if db.query(User).filter(User.email == user.email).first():
         raise HTTPException(status_code=400, detail="Email already registered")
-    
-    db_user = User(username=user.username, email=user.email)
-    db_user.set_password(user.password)
+
+def _create_user(db: Session, user: UserCreate, hashed_password: str):
+    db_user = User(username=user.username, email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
+@router.post("/register", response_model=UserOut)
+async def register(user: UserCreate, db=Depends(get_db)):
+    await run_db(db, _check_available, user)
+    hashed_password = await password_hasher.run(hash_password, user.password)
+    return await run_db(db, _create_user, user, hashed_password)
+
+def _get_user(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+def _rehash(db: Session, user_id: int, hashed_password: str):
+    # Through the ORM, not a bulk update, so the after_update hook drops the cached principal.
+    db.get(User, user_id).hashed_password = hashed_password
+    db.commit()
+
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+async def login(user: UserLogin, db=Depends(get_db)):
+    db_user = await run_db(db, _get_user, user.username)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await password_hasher.run(verify_and_update, user.password, db_user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        await run_db(db, _rehash, db_user.id, new_hash)
     
-    access_token = create_access_token(data={"sub": str(db_user.username)})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    claims = {"sub": str(db_user.username)}
+    if settings.token_embed_user_id:
+        claims["uid"] = db_user.id
+    access_token = create_access_token(data=claims)
+    return {"access_token": access_token, "token_type": "bearer"}
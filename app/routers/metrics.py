@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.auth.utils import password_hasher
+from app.database import pool_metrics
+from app.dependencies.auth import principal_cache, require_metrics_token
+from app.utils.activity import activity_writer
+from app.utils import diff, versioning
+from app.utils.activity_retention import activity_maintenance
+from app.utils.events import hub
+from app.utils.instrumentation import request_metrics
+from app.utils.read_cache import read_cache
+from app.utils.replicas import replica_set
+from app.utils.version_retention import version_compaction
+
+router = APIRouter(dependencies=[Depends(require_metrics_token)])
+
+@router.get("", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text format: request latency, status and SQL query histograms per route
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/activity-log")
+def activity_log_metrics():
+    return {**activity_writer.stats(), "maintenance": activity_maintenance.stats()}
+
+@router.get("/pool")
+def pool_stats():
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+@router.get("/replicas")
+def replica_stats():
+    return replica_set.stats()
+
+@router.get("/auth")
+def auth_stats():
+    return {"principal_cache": principal_cache.stats(), "password_hasher": password_hasher.stats()}
+
+@router.get("/versions")
+def version_stats():
+    return version_compaction.stats()
+
+@router.get("/cache")
+def cache_stats():
+    return {"read_cache": read_cache.stats(), "version_contents": versioning.stats(), "diffs": diff.stats()}
+
+@router.get("/stream")
+def stream_stats():
+    return hub.stats()
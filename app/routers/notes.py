@@ -1,110 +1,364 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.database import get_db
-from app.schemas.note import NoteCreate, NoteUpdate, Note, CollaboratorAdd, SearchQuery
+from collections import Counter
+from sqlalchemy import and_, delete, func, insert, or_, select, true, union_all, update
+from app.config import settings
+from app.database import SessionLocal, get_db, run_db
+from app.schemas.note import NoteCreate, NoteUpdate, Note, NoteListItem, CollaboratorAdd, SearchResult, NoteBatch, NoteBatchResult, NoteImportResult
+from app.schemas.activity_log import ActivityLog as ActivityLogSchema, ActivityLogSummary
 from app.models.note import Note as NoteModel, note_collaborators
 from app.models.version import Version
 from app.models.activity_log import ActivityLog
 from app.dependencies.auth import get_current_user
 from app.models.user import User
-from datetime import datetime
+from app.utils import access, activity_retention, conditional, events, search, transfer, versioning
+from app.utils.activity import activity_writer
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.read_cache import note_key, read_cache, response as read_cache_response
+from app.utils.replicas import on_replica
+from datetime import datetime, timedelta
 
 router = APIRouter()
 
-def check_note_access(note: NoteModel, user: User) -> bool:
-    return note.owner_id == user.id or user in note.collaborators
+PREVIEW_LENGTH = 200
+BATCH_LIMIT = 1000  # items per POST /notes/batch and ids per GET /notes?ids=
 
-@router.post("/", response_model=Note)
-def create_note(note: NoteCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def _create_note(db: Session, note: NoteCreate, current_user: User):
     db_note = NoteModel(title=note.title, content=note.content, owner_id=current_user.id)
     db.add(db_note)
     db.commit()
     db.refresh(db_note)
+    events.notify(db, "note.created", db_note.id, current_user.id, audience={current_user.id},
+                  etag=conditional.note_etag(db_note.id, db_note.version_count, db_note.updated_at))
     return db_note
 
-@router.get("/", response_model=list[Note])
-def get_notes(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(NoteModel).filter(
-        or_(NoteModel.owner_id == current_user.id, NoteModel.collaborators.any(id=current_user.id))
-    ).all()
+@router.post("/", response_model=Note)
+async def create_note(note: NoteCreate, db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _create_note, note, current_user)
+
+def _parse_ids(ids: str) -> list[int]:
+    try:
+        note_ids = sorted({int(note_id) for note_id in ids.split(",") if note_id.strip()})
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be a comma-separated list of integers")
+    if len(note_ids) > BATCH_LIMIT:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {BATCH_LIMIT} ids per request")
+    return note_ids
+
+def _get_notes(db: Session, response: Response, limit: int, cursor: Optional[str], view: str, ids: Optional[str], current_user: User):
+    columns = [NoteModel.id, NoteModel.title, NoteModel.owner_id, NoteModel.created_at, NoteModel.updated_at]
+    if view == "summary":
+        columns.append(func.substr(NoteModel.content, 1, PREVIEW_LENGTH).label("preview"))
+    else:
+        columns.append(NoteModel.content)
+    if ids is not None:
+        # Batch fetch: every requested note the user can access, in one query and unpaginated.
+        # Missing and inaccessible ids are simply absent from the result.
+        return db.query(*columns).filter(NoteModel.id.in_(_parse_ids(ids)), access.access_filter(current_user.id)).order_by(NoteModel.id).all()
+    after = true()
+    if cursor:
+        updated_at, last_id = decode_cursor(cursor, 2)
+        try:
+            updated_at = datetime.fromisoformat(updated_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        after = or_(NoteModel.updated_at < updated_at, and_(NoteModel.updated_at == updated_at, NoteModel.id < last_id))
+    # Owned and shared notes are paged separately and merged: with a single `owner_id = :u OR
+    # id IN (shared)` filter the planner cannot walk ix_notes_owner_updated in order and sorts
+    # every reachable note on every page instead.
+    newest = (NoteModel.updated_at.desc(), NoteModel.id.desc())
+    owned = select(*columns).where(NoteModel.owner_id == current_user.id, after).order_by(*newest).limit(limit + 1).subquery()
+    shared = select(*columns).join(note_collaborators, and_(
+        note_collaborators.c.note_id == NoteModel.id, note_collaborators.c.user_id == current_user.id,
+    )).where(NoteModel.owner_id != current_user.id, after).order_by(*newest).limit(limit + 1).subquery()
+    reachable = union_all(select(owned), select(shared)).subquery()
+    notes = db.execute(select(reachable).order_by(reachable.c.updated_at.desc(), reachable.c.id.desc()).limit(limit + 1)).all()
+    if len(notes) > limit:
+        notes = notes[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(notes[-1].updated_at.isoformat(), notes[-1].id)
+    return notes
+
+@router.get("/", response_model=list[NoteListItem], response_model_exclude_none=True)
+async def get_notes(response: Response, limit: int = Query(50, ge=1, le=100), cursor: Optional[str] = None, view: Literal["full", "summary"] = "full", ids: Optional[str] = None, db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _get_notes, response, limit, cursor, view, ids, current_user)
+
+@versioning.retry_on_version_conflict
+def _batch_notes(db: Session, batch: NoteBatch, current_user: User):
+    if len(batch.create) + len(batch.update) + len(batch.delete) > BATCH_LIMIT:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"At most {BATCH_LIMIT} items per batch")
+    results = []
+    now = datetime.utcnow()
+
+    created = []
+    if batch.create:
+        rows = [{"title": item.title, "content": item.content, "owner_id": current_user.id, "created_at": now, "updated_at": now} for item in batch.create]
+        created = db.scalars(insert(NoteModel).returning(NoteModel.id, sort_by_parameter_order=True), rows).all()
+    results += [{"op": "create", "index": index, "id": note_id, "status": status.HTTP_201_CREATED} for index, note_id in enumerate(created)]
+
+    # A note may be touched by one item only; otherwise the outcome would depend on ordering.
+    counts = Counter([item.id for item in batch.update] + batch.delete)
+    duplicate = {"status": status.HTTP_409_CONFLICT, "detail": "Note appears more than once in batch"}
+
+    update_ids = [item.id for item in batch.update if counts[item.id] == 1]
+    previous = dict(db.query(NoteModel.id, NoteModel.content).filter(NoteModel.id.in_(update_ids), access.access_filter(current_user.id)).all()) if update_ids else {}
+    numbers = versioning.add_versions(db, previous, current_user.id)
+    updates = []
+    for index, item in enumerate(batch.update):
+        result = {"op": "update", "index": index, "id": item.id}
+        if counts[item.id] > 1:
+            result.update(duplicate)
+        elif item.id not in previous:
+            result.update(status=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
+        else:
+            result.update(status=status.HTTP_200_OK, version_number=numbers[item.id])
+            updates.append({"id": item.id, "title": item.title, "content": item.content, "updated_at": now, "last_editor_id": None})
+        results.append(result)
+    if updates:
+        db.execute(update(NoteModel), updates)
+        db.execute(insert(ActivityLog), [{"note_id": row["id"], "user_id": current_user.id, "action": "edit", "timestamp": now} for row in updates])
+
+    delete_ids = [note_id for note_id in batch.delete if counts[note_id] == 1]
+    owned = set(db.scalars(select(NoteModel.id).where(NoteModel.id.in_(delete_ids), NoteModel.owner_id == current_user.id)).all()) if delete_ids else set()
+    for index, note_id in enumerate(batch.delete):
+        result = {"op": "delete", "index": index, "id": note_id}
+        if counts[note_id] > 1:
+            result.update(duplicate)
+        elif note_id not in owned:
+            result.update(status=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
+        else:
+            result.update(status=status.HTTP_200_OK)
+        results.append(result)
+    listening = events.hub.listening()
+    audiences = access.audiences(db, list(previous) + list(owned)) if listening and (updates or owned) else {}
+    if owned:
+        # Same rows a single delete removes; activity logs reference the note too (rollups are kept)
+        db.execute(delete(ActivityLog).where(ActivityLog.note_id.in_(owned)))
+        db.execute(delete(Version).where(Version.note_id.in_(owned)))
+        db.execute(delete(note_collaborators).where(note_collaborators.c.note_id.in_(owned)))
+        db.execute(delete(NoteModel).where(NoteModel.id.in_(owned)))
 
-@router.get("/{note_id}", response_model=Note)
-def get_note(note_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    note = db.query(NoteModel).filter(NoteModel.id == note_id).first()
-    if not note or not check_note_access(note, current_user):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
-    # Log activity
-    log = ActivityLog(note_id=note_id, user_id=current_user.id, action="view")
-    db.add(log)
     db.commit()
-    return note
+    for row in updates:
+        read_cache.forget(note_key(row["id"]))
+    for note_id in owned:
+        versioning.forget_note(note_id)
+        access.forget(note_id)
+    if listening:
+        for note_id in created:
+            events.notify(db, "note.created", note_id, current_user.id, audience={current_user.id})
+        for row in updates:
+            events.notify(db, "note.updated", row["id"], current_user.id, audience=audiences.get(row["id"], set()))
+        for note_id in owned:
+            events.notify(db, "note.deleted", note_id, current_user.id, audience=audiences.get(note_id, set()))
+    return {"results": results}
 
-@router.put("/{note_id}", response_model=Note)
-def update_note(note_id: int, note_update: NoteUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    note = db.query(NoteModel).filter(NoteModel.id == note_id).first()
-    if not note or not check_note_access(note, current_user):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
-    last_version = db.query(Version).filter(Version.note_id == note_id).order_by(Version.version_number.desc()).first()
-    version_number = (last_version.version_number + 1) if last_version else 1
-    version = Version(note_id=note_id, version_number=version_number, content_snapshot=note.content, editor_id=current_user.id)
-    db.add(version)
+@router.post("/batch", response_model=NoteBatchResult, response_model_exclude_none=True)
+async def batch_notes(batch: NoteBatch, db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _batch_notes, batch, current_user)
+
+@router.get("/stream")
+async def stream_notes(current_user: User = Depends(get_current_user)):
+    # Server-Sent Events: create/update/restore/delete and collaborator changes on every note
+    # the user can access, as they are committed. A client that falls behind gets a `resync`
+    # event and the stream ends; it should refetch and reconnect.
+    subscription = events.hub.subscribe(current_user.id)
+    return StreamingResponse(events.hub.stream(subscription), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/export")
+async def export_notes(format: Literal["ndjson", "gzip"] = "ndjson", current_user: User = Depends(get_current_user)):
+    # Streams the user's own notes with full version history and activity logs. The export
+    # reads through server-side cursors on its own sync sessions, so memory stays flat.
+    gzip = format == "gzip"
+    filename = "notes-export.ndjson" + (".gz" if gzip else "")
+    return StreamingResponse(transfer.buffered(transfer.export_lines(SessionLocal, current_user.id), gzip=gzip),
+                             media_type="application/gzip" if gzip else "application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.post("/import", response_model=NoteImportResult, status_code=status.HTTP_201_CREATED)
+async def import_notes(request: Request, db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    # Accepts the export format, plain or gzip. The body is parsed as it arrives and written in
+    # chunks of transfer.CHUNK_SIZE records; everything is committed at the end or not at all.
+    importer = transfer.Importer(current_user.id)
+    chunk = []
+    async for _, record in transfer.read_lines(request.stream()):
+        chunk.append(record)
+        if len(chunk) >= transfer.CHUNK_SIZE:
+            await run_db(db, importer.import_chunk, chunk)
+            chunk = []
+    if chunk:
+        await run_db(db, importer.import_chunk, chunk)
+    return await run_db(db, importer.finish)
+
+def _search_notes(db: Session, response: Response, query: str, limit: int, cursor: Optional[str], current_user: User):
+    results, next_cursor = search.search_notes(db, current_user.id, query, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return results
+
+@router.get("/search", response_model=list[SearchResult])
+async def search_notes(response: Response, query: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None, db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _search_notes, response, query, limit, cursor, current_user)
+
+def _get_note(db: Session, note_id: int, if_none_match: Optional[str], current_user: User):
+    etag = None
+    cached = read_cache.get(note_key(note_id))
+    if cached is not None or if_none_match is not None:
+        # Revalidation: answer from the metadata columns alone while the cached or client's copy is current
+        state = access.get_note_state(db, note_id, current_user.id)
+        etag = conditional.note_etag(state.id, state.version_count, state.updated_at)
+        if cached is not None and cached[0] != etag:
+            cached = None
+    if etag is not None and conditional.matches(if_none_match, etag):
+        return conditional.not_modified(etag)
+    if cached is None:
+        note = access.get_accessible_note(db, note_id, current_user.id)
+        cached = conditional.note_etag(note.id, note.version_count, note.updated_at), Note.model_validate(note).model_dump_json().encode()
+        # A copy read from a lagging replica would only fail other workers' revalidation
+        if not (read_cache.backend.shared and on_replica(db)):
+            read_cache.set(note_key(note_id), *cached)
+    # Views are logged through the batched writer so reads stay read-only transactions
+    activity_writer.record(note_id, current_user.id, "view")
+    return read_cache_response(*cached)
+
+@router.get("/{note_id}", response_model=Note)
+async def get_note(note_id: int, if_none_match: Optional[str] = Header(None), db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _get_note, note_id, if_none_match, current_user)
+
+def _coalesce_edit(db: Session, note: NoteModel, note_update: NoteUpdate, if_match: Optional[str], user_id: int, now: datetime) -> bool:
+    """Apply the edit to the pending version's window: no new version, no log row.
+
+    The UPDATE only matches while this editor still owns the window and no version was
+    claimed since `note` was loaded, so concurrent requests on any worker either coalesce
+    in turn or fall through to a regular versioned edit.
+    """
+    if not (note.last_editor_id == user_id and note.coalesce_until is not None and note.coalesce_until > now):
+        return False
+    if if_match is not None and not conditional.matches(if_match, conditional.note_etag(note.id, note.version_count, note.updated_at)):
+        conditional.precondition_failed()
+    conditions = [NoteModel.id == note.id, NoteModel.last_editor_id == user_id, NoteModel.coalesce_until > now,
+                  NoteModel.version_count == note.version_count]
+    if if_match is not None and if_match.strip() != "*":
+        conditions.append(NoteModel.updated_at == note.updated_at)
+    result = db.execute(update(NoteModel).where(*conditions).values(title=note_update.title, content=note_update.content, updated_at=now),
+                        execution_options={"synchronize_session": False})
+    if result.rowcount != 1:
+        if if_match is not None and if_match.strip() != "*":
+            conditional.precondition_failed()
+        return False
+    return True
+
+@versioning.retry_on_version_conflict
+def _update_note(db: Session, response: Response, note_id: int, note_update: NoteUpdate, if_match: Optional[str], current_user: User):
+    note = access.get_accessible_note(db, note_id, current_user.id)
+    now = datetime.utcnow()
+    if settings.edit_coalesce_window > 0 and _coalesce_edit(db, note, note_update, if_match, current_user.id, now):
+        db.commit()
+        read_cache.forget(note_key(note_id))
+        response.headers["ETag"] = conditional.note_etag(note.id, note.version_count, now)
+        events.notify(db, "note.updated", note_id, current_user.id, etag=response.headers["ETag"])
+        return Note(id=note.id, title=note_update.title, content=note_update.content, owner_id=note.owner_id, created_at=note.created_at, updated_at=now)
+    versioning.add_version(db, note_id, conditional.claim_version(db, note, if_match), note.content, current_user.id)
     note.title = note_update.title
     note.content = note_update.content
-    note.updated_at = datetime.utcnow()
+    note.updated_at = now
+    if settings.edit_coalesce_window > 0:
+        # This version is the pending one: further edits by this editor within the window
+        # update the note without a version or log row of their own
+        note.last_editor_id = current_user.id
+        note.coalesce_until = now + timedelta(seconds=settings.edit_coalesce_window)
     log = ActivityLog(note_id=note_id, user_id=current_user.id, action="edit")
     db.add(log)
     db.commit()
+    read_cache.forget(note_key(note_id))
     db.refresh(note)
+    response.headers["ETag"] = conditional.note_etag(note.id, note.version_count, note.updated_at)
+    events.notify(db, "note.updated", note_id, current_user.id, etag=response.headers["ETag"])
     return note
 
-@router.delete("/{note_id}")
-def delete_note(note_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.put("/{note_id}", response_model=Note)
+async def update_note(response: Response, note_id: int, note_update: NoteUpdate, if_match: Optional[str] = Header(None), db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _update_note, response, note_id, note_update, if_match, current_user)
+
+def _delete_note(db: Session, note_id: int, current_user: User):
     note = db.query(NoteModel).filter(NoteModel.id == note_id, NoteModel.owner_id == current_user.id).first()  # Only owner can delete
     if not note:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
+    audience = access.audience(db, note_id) if events.hub.listening() else None
+    db.execute(delete(ActivityLog).where(ActivityLog.note_id == note_id))  # not an ORM relationship of Note
     db.delete(note)
     db.commit()
+    versioning.forget_note(note_id)
+    access.forget(note_id)
+    events.notify(db, "note.deleted", note_id, current_user.id, audience=audience)
     return {"message": "Note deleted successfully"}
 
-@router.post("/{note_id}/collaborators", response_model=dict)
-def add_collaborator(note_id: int, collab: CollaboratorAdd, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.delete("/{note_id}")
+async def delete_note(note_id: int, db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _delete_note, note_id, current_user)
+
+def _add_collaborator(db: Session, note_id: int, collab: CollaboratorAdd, current_user: User):
     note = db.query(NoteModel).filter(NoteModel.id == note_id, NoteModel.owner_id == current_user.id).first()  # Only owner
     if not note:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or not owner")
     user = db.query(User).filter(User.username == collab.username).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if user in note.collaborators:
+    if access.is_collaborator(db, note_id, user.id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already a collaborator")
-    note.collaborators.append(user)
+    access.add_collaborator(db, note_id, user.id)
     db.commit()
+    access.forget(note_id, user.id)
+    read_cache.forget(note_key(note_id))
+    events.notify(db, "collaborator.added", note_id, current_user.id, user_id=user.id)
     return {"message": f"Collaborator {collab.username} added"}
 
-@router.delete("/{note_id}/collaborators/{user_id}")
-def remove_collaborator(note_id: int, user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.post("/{note_id}/collaborators", response_model=dict)
+async def add_collaborator(note_id: int, collab: CollaboratorAdd, db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _add_collaborator, note_id, collab, current_user)
+
+def _remove_collaborator(db: Session, note_id: int, user_id: int, current_user: User):
     note = db.query(NoteModel).filter(NoteModel.id == note_id, NoteModel.owner_id == current_user.id).first()  # Only owner
     if not note:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or not owner")
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user or user not in note.collaborators:
+    audience = access.audience(db, note_id) if events.hub.listening() else None
+    if not access.remove_collaborator(db, note_id, user_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collaborator not found")
-    note.collaborators.remove(user)
     db.commit()
+    access.forget(note_id, user_id)
+    read_cache.forget(note_key(note_id))
+    events.notify(db, "collaborator.removed", note_id, current_user.id, audience=audience, user_id=user_id)
     return {"message": f"Collaborator removed"}
 
-@router.get("/search", response_model=list[Note])
-def search_notes(search: SearchQuery, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    query = search.query.lower()
-    notes = db.query(NoteModel).filter(
-        or_(NoteModel.owner_id == current_user.id, NoteModel.collaborators.any(id=current_user.id)),
-        or_(NoteModel.title.ilike(f"%{query}%"), NoteModel.content.ilike(f"%{query}%"))
-    ).all()
-    return notes
+@router.delete("/{note_id}/collaborators/{user_id}")
+async def remove_collaborator(note_id: int, user_id: int, db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _remove_collaborator, note_id, user_id, current_user)
 
-@router.get("/{note_id}/logs", response_model=list[ActivityLog])
-def get_note_logs(note_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    note = db.query(NoteModel).filter(NoteModel.id == note_id).first()
-    if not note or not check_note_access(note, current_user):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
-    return db.query(ActivityLog).filter(ActivityLog.note_id == note_id).order_by(ActivityLog.timestamp.desc()).all()
\ No newline at end of file
+def _get_note_logs(db: Session, response: Response, note_id: int, limit: int, cursor: Optional[str], view: str, current_user: User):
+    access.ensure_note_access(db, note_id, current_user.id)
+    if view == "summary":
+        rows, next_cursor = activity_retention.summarize(db, note_id, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return rows
+    query = db.query(ActivityLog).filter(ActivityLog.note_id == note_id)
+    if cursor:
+        timestamp, last_id = decode_cursor(cursor, 2)
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(or_(ActivityLog.timestamp < timestamp, and_(ActivityLog.timestamp == timestamp, ActivityLog.id < last_id)))
+    logs = query.order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc()).limit(limit + 1).all()
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(logs[-1].timestamp.isoformat(), logs[-1].id)
+    return logs
+
+@router.get("/{note_id}/logs", response_model=list[ActivityLogSchema] | list[ActivityLogSummary])
+async def get_note_logs(response: Response, note_id: int, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None, view: Literal["raw", "summary"] = "raw", db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    # Eventually consistent: views go through the batched writer and show up once it flushes,
+    # within activity_log_flush_interval seconds. Edits and restores are written with the change.
+    return await run_db(db, _get_note_logs, response, note_id, limit, cursor, view, current_user)
@@ -1,57 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.schemas.version import Version as VersionSchema
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session, load_only
+from app.database import get_db, run_db
+from app.schemas.version import VersionOut as VersionSchema, VersionDiff, VersionListItem
 from app.models.version import Version
-from app.models.note import Note
 from app.models.activity_log import ActivityLog
 from app.dependencies.auth import get_current_user
 from app.models.user import User
+from app.utils import access, conditional, diff, events, versioning
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.read_cache import note_key, read_cache, response as read_cache_response, version_key
 from datetime import datetime
 
 router = APIRouter()
 
-def check_note_access(note: Note, user: User) -> bool:
-    return note.owner_id == user.id or user in note.collaborators
+def version_out(version: Version, content: str) -> VersionSchema:
+    return VersionSchema(id=version.id, note_id=version.note_id, version_number=version.version_number,
+                         content_snapshot=content, editor_id=version.editor_id, timestamp=version.timestamp)
 
-@router.get("/{note_id}", response_model=list[VersionSchema])
-def get_versions(note_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # Check if note exists and belongs to user
-    note = db.query(Note).filter(Note.id == note_id).first()
-    if not note or not check_note_access(note, current_user):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
-    return db.query(Version).filter(Version.note_id == note_id).order_by(Version.version_number).all()
+CONTENT_PAGE_LIMIT = 100  # versions per page when content=true
 
-@router.get("/{note_id}/{version_number}", response_model=VersionSchema)
-def get_version(note_id: int, version_number: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # Check if note exists and belongs to user
-    note = db.query(Note).filter(Note.id == note_id).first()
-    if not note or not check_note_access(note, current_user):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
+def _get_versions(db: Session, response: Response, note_id: int, limit: int, cursor: Optional[str], from_version: Optional[int], to_version: Optional[int], content: bool, if_none_match: Optional[str], current_user: User):
+    if content and limit > CONTENT_PAGE_LIMIT:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {CONTENT_PAGE_LIMIT} versions per page with content")
+    # The history only grows through the note's version counter and shrinks through compaction,
+    # which counts what it removes, so the two identify every page
+    state = access.get_note_state(db, note_id, current_user.id)
+    etag = conditional.versions_etag(note_id, state.version_count, state.history_pruned)
+    if conditional.matches(if_none_match, etag):
+        return conditional.not_modified(etag)
+    query = db.query(Version).filter(Version.note_id == note_id)
+    if not content:
+        query = query.options(load_only(Version.id, Version.note_id, Version.version_number, Version.editor_id, Version.timestamp))
+    if cursor:
+        after = decode_cursor(cursor, 1)[0]
+        if not isinstance(after, int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(Version.version_number > after)
+    if from_version is not None:
+        query = query.filter(Version.version_number >= from_version)
+    if to_version is not None:
+        query = query.filter(Version.version_number <= to_version)
+    # Ordered by the (note_id, version_number) unique index
+    versions = query.order_by(Version.version_number).limit(limit + 1).all()
+    if len(versions) > limit:
+        versions = versions[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(versions[-1].version_number)
+    response.headers["ETag"] = etag
+    if not content:
+        # Built explicitly: serializing the ORM rows would lazy-load the deferred content column
+        return [VersionListItem(id=version.id, note_id=version.note_id, version_number=version.version_number,
+                                editor_id=version.editor_id, timestamp=version.timestamp) for version in versions]
+    return [version_out(version, text) for version, text in zip(versions, versioning.get_contents(db, versions))]
+
+@router.get("/{note_id}", response_model=list[VersionListItem], response_model_exclude_none=True)
+async def get_versions(response: Response, note_id: int, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None, from_version: Optional[int] = Query(None, alias="from", ge=1), to_version: Optional[int] = Query(None, alias="to", ge=1), content: bool = False, if_none_match: Optional[str] = Header(None), db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    # Metadata only by default; content=true adds each version's text for a page of at most
+    # CONTENT_PAGE_LIMIT versions, e.g. the range picked with from/to.
+    return await run_db(db, _get_versions, response, note_id, limit, cursor, from_version, to_version, content, if_none_match, current_user)
+
+def _history_generation(db: Session, note_id: int, user_id: int) -> int:
+    # Compaction may remove versions without reaching this worker's caches (or after a fill
+    # raced it), so entries are keyed by the note's history_pruned count, read with the access check.
+    return access.get_note_state(db, note_id, user_id).history_pruned
+
+def _diff_versions(db: Session, note_id: int, from_version: int, to_version: int, granularity: str, context: int, format: str, current_user: User):
+    pruned = access.get_note_state(db, note_id, current_user.id).history_pruned  # see _history_generation
+
+    def compute():
+        versions = {version.version_number: version for version in db.query(Version).filter(
+            Version.note_id == note_id, Version.version_number.in_({from_version, to_version}))}
+        if from_version not in versions or to_version not in versions:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
+        return diff.diff_texts(versioning.get_content(db, versions[from_version]), versioning.get_content(db, versions[to_version]), granularity, context)
+
+    result = diff.cached_diff((note_id, from_version, to_version, granularity, context, pruned), compute)
+    if format == "unified":
+        return PlainTextResponse(diff.unified(result, f"v{from_version}", f"v{to_version}"), media_type="text/x-diff")
+    return {"note_id": note_id, "from_version": from_version, "to_version": to_version, **result}
+
+@router.get("/{note_id}/diff", response_model=VersionDiff)
+async def diff_versions(note_id: int, from_version: int = Query(..., alias="from", ge=1), to_version: int = Query(..., alias="to", ge=1), granularity: Literal["line", "word"] = "line", context: int = Query(3, ge=0, le=100), format: Literal["split", "unified"] = "split", db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _diff_versions, note_id, from_version, to_version, granularity, context, format, current_user)
+
+def _get_version(db: Session, note_id: int, version_number: int, if_none_match: Optional[str], current_user: User):
+    key = version_key(note_id, version_number, _history_generation(db, note_id, current_user.id))
+    # A version never changes while its entry is reachable, so a cached copy needs no revalidation
+    cached = read_cache.get(key)
+    if cached is not None:
+        if conditional.matches(if_none_match, cached[0]):
+            return conditional.not_modified(cached[0])
+        return read_cache_response(*cached)
+    if if_none_match is not None:
+        version_id = db.query(Version.id).filter(Version.note_id == note_id, Version.version_number == version_number).scalar()
+        etag = version_id and conditional.version_etag(note_id, version_number, version_id)
+        if version_id is not None and conditional.matches(if_none_match, etag):
+            return conditional.not_modified(etag)
     version = db.query(Version).filter(Version.note_id == note_id, Version.version_number == version_number).first()
     if not version:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
-    return version
+    cached = conditional.version_etag(note_id, version_number, version.id), version_out(version, versioning.get_content(db, version)).model_dump_json().encode()
+    read_cache.set(key, *cached)
+    return read_cache_response(*cached)
 
-@router.post("/{note_id}/restore/{version_number}")
-def restore_version(note_id: int, version_number: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # Check if note exists and belongs to user
-    note = db.query(Note).filter(Note.id == note_id).first()
-    if not note or not check_note_access(note, current_user):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found or access denied")
+@router.get("/{note_id}/{version_number}", response_model=VersionSchema)
+async def get_version(note_id: int, version_number: int, if_none_match: Optional[str] = Header(None), db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _get_version, note_id, version_number, if_none_match, current_user)
+
+@versioning.retry_on_version_conflict
+def _restore_version(db: Session, response: Response, note_id: int, version_number: int, if_match: Optional[str], current_user: User):
+    note = access.get_accessible_note(db, note_id, current_user.id)
     version = db.query(Version).filter(Version.note_id == note_id, Version.version_number == version_number).first()
     if not version:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
     # Create a new version of current state before restoring
-    last_version = db.query(Version).filter(Version.note_id == note_id).order_by(Version.version_number.desc()).first()
-    new_version_number = (last_version.version_number + 1) if last_version else 1
-    current_version = Version(note_id=note_id, version_number=new_version_number, content_snapshot=note.content, editor_id=current_user.id)
-    db.add(current_version)
+    restored_content = versioning.get_content(db, version)
+    versioning.add_version(db, note_id, conditional.claim_version(db, note, if_match), note.content, current_user.id)
     # Restore note to version
-    note.content = version.content_snapshot
+    note.content = restored_content
     note.updated_at = datetime.utcnow()
+    note.last_editor_id = None  # the next edit gets a version of its own
     # Log activity
     log = ActivityLog(note_id=note_id, user_id=current_user.id, action="restore")
     db.add(log)
     db.commit()
-    return {"message": f"Note restored to version {version_number}"}
\ No newline at end of file
+    read_cache.forget(note_key(note_id))
+    response.headers["ETag"] = conditional.note_etag(note.id, note.version_count, note.updated_at)
+    events.notify(db, "note.restored", note_id, current_user.id, etag=response.headers["ETag"], version_number=version_number)
+    return {"message": f"Note restored to version {version_number}"}
+
+@router.post("/{note_id}/restore/{version_number}")
+async def restore_version(response: Response, note_id: int, version_number: int, if_match: Optional[str] = Header(None), db=Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, _restore_version, response, note_id, version_number, if_match, current_user)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from datetime import date, datetime
 
 class ActivityLogBase(BaseModel):
     note_id: int
@@ -10,5 +10,10 @@ class ActivityLogBase(BaseModel):
 class ActivityLog(ActivityLogBase):
     id: int
 
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class ActivityLogSummary(BaseModel):
+    day: date
+    user_id: int
+    action: str
+    count: int
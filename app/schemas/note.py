@@ -1,15 +1,17 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, ConfigDict, field_validator
 from datetime import datetime
+from typing import Literal, Optional
 
 class NoteBase(BaseModel):
     title: str
     content: str
 
-    @validator('title', 'content')
+    @field_validator('title', 'content')
+    @classmethod
     def must_not_be_empty(cls, v):
         if not v or not v.strip():
             raise ValueError('Field must not be empty')
-            return v
+        return v
 
 class NoteCreate(NoteBase):
     pass
@@ -23,11 +25,51 @@ class Note(NoteBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class NoteListItem(BaseModel):
+    id: int
+    title: str
+    owner_id: int
+    created_at: datetime
+    updated_at: datetime
+    content: Optional[str] = None  # view=full
+    preview: Optional[str] = None  # view=summary
+
+    model_config = ConfigDict(from_attributes=True)
 
 class CollaboratorAdd(BaseModel):  # New for collaborators
     username: str
 
-class SearchQuery(BaseModel):  # New for search
-    query: str  # Search term for title/content
\ No newline at end of file
+class SearchResult(BaseModel):
+    id: int
+    title: str
+    snippet: str
+    rank: float
+    owner_id: int
+    created_at: datetime
+    updated_at: datetime
+
+class NoteBatchUpdate(NoteBase):
+    id: int
+
+class NoteBatch(BaseModel):
+    create: list[NoteCreate] = []
+    update: list[NoteBatchUpdate] = []
+    delete: list[int] = []
+
+class BatchItemResult(BaseModel):
+    op: Literal["create", "update", "delete"]
+    index: int  # position of the item in its list of the request
+    id: Optional[int] = None
+    status: int
+    version_number: Optional[int] = None  # update: version holding the previous content
+    detail: Optional[str] = None
+
+class NoteBatchResult(BaseModel):
+    results: list[BatchItemResult]
+
+class NoteImportResult(BaseModel):
+    notes: int
+    versions: int
+    logs: int
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
+from datetime import datetime
 
 class UserCreate(BaseModel):
     username: str
@@ -13,7 +14,6 @@ class UserOut(BaseModel):
     id: int
     username: str
     email: str
-    created_at: str
+    created_at: datetime
 
-class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
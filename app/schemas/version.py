@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
 
 class VersionOut(BaseModel):
     id: int
@@ -6,7 +8,45 @@ class VersionOut(BaseModel):
     version_number: int
     content_snapshot: str
     editor_id: int
-    timestamp: str
+    timestamp: datetime
 
-class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class VersionListItem(BaseModel):
+    id: int
+    note_id: int
+    version_number: int
+    editor_id: int
+    timestamp: datetime
+    content_snapshot: Optional[str] = None  # content=true only
+
+    model_config = ConfigDict(from_attributes=True)
+
+class DiffSegment(BaseModel):
+    op: Literal["equal", "delete", "insert"]
+    text: str
+
+class DiffLine(BaseModel):
+    line: int
+    text: str
+    segments: Optional[list[DiffSegment]] = None  # word-level changes, granularity=word only
+
+class DiffRow(BaseModel):
+    op: Literal["equal", "replace", "delete", "insert"]
+    left: Optional[DiffLine] = None
+    right: Optional[DiffLine] = None
+
+class DiffHunk(BaseModel):
+    old_start: int
+    old_lines: int
+    new_start: int
+    new_lines: int
+    rows: list[DiffRow]
+
+class VersionDiff(BaseModel):
+    note_id: int
+    from_version: int
+    to_version: int
+    added: int
+    removed: int
+    hunks: list[DiffHunk]
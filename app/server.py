@@ -0,0 +1,64 @@
+"""Production server: gunicorn supervising uvicorn workers on uvloop and httptools.
+
+    python -m app.server
+    WEB_WORKERS=8 WEB_BIND=0.0.0.0:8080 python -m app.server
+
+The app is imported once in the master and the workers are forked from it, so they start
+without repeating the imports; engines, pools and background threads are created by each
+worker's lifespan, never shared across the fork. SIGTERM (or SIGHUP for a rolling reload)
+stops accepting connections and gives in-flight requests WEB_GRACEFUL_TIMEOUT seconds.
+"""
+import gc
+import os
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+from app.config import settings
+
+SHUTDOWN_RESERVE = 5.0  # seconds of the graceful timeout kept for the lifespan shutdown
+
+def default_workers() -> int:
+    # CPUs this process may run on, which respects container CPU sets
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+class Worker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Requests still open (event streams never finish) are cancelled before gunicorn kills
+        # the worker, so the lifespan shutdown still flushes the activity log and closes pools.
+        self.config.timeout_graceful_shutdown = max(self.cfg.graceful_timeout - SHUTDOWN_RESERVE, 1)
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        from app.main import app
+        if self.cfg.preload_app:
+            # Keep the collector from touching (and so copying) the objects the forked
+            # workers share with the master
+            gc.collect()
+            gc.freeze()
+        return app
+
+def options() -> dict:
+    return {
+        "bind": settings.web_bind,
+        "workers": settings.web_workers or default_workers(),
+        "worker_class": "app.server.Worker",
+        "graceful_timeout": settings.web_graceful_timeout,
+        "keepalive": settings.web_keepalive,
+        "max_requests": settings.web_max_requests,
+        "max_requests_jitter": settings.web_max_requests // 10,
+        "preload_app": settings.web_preload,
+        "forwarded_allow_ips": settings.web_forwarded_allow_ips,
+    }
+
+if __name__ == "__main__":
+    Server(options()).run()
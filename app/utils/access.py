@@ -0,0 +1,87 @@
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, exists, insert, or_, select, union_all
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.note import Note, note_collaborators
+from app.utils.cache import LRUCache
+from app.utils.lazy import Lazy
+
+# (user_id, note_id) -> True for recently confirmed access. Only grants are cached, so a
+# removed collaborator can keep access for at most acl_cache_ttl seconds on other workers.
+acl_cache = Lazy(lambda: LRUCache(settings.acl_cache_size, ttl=settings.acl_cache_ttl))
+
+NOT_FOUND = "Note not found or access denied"
+
+def access_filter(user_id: int):
+    """SQL condition: the current Note row is owned by or shared with `user_id`."""
+    return or_(
+        Note.owner_id == user_id,
+        exists().where(and_(note_collaborators.c.note_id == Note.id, note_collaborators.c.user_id == user_id)),
+    )
+
+def _cached(user_id: int, note_id: int) -> bool:
+    return settings.acl_cache_ttl > 0 and acl_cache.get((user_id, note_id)) is not None
+
+def _remember(user_id: int, note_id: int):
+    if settings.acl_cache_ttl > 0:
+        acl_cache.set((user_id, note_id), True)
+
+def get_accessible_note(db: Session, note_id: int, user_id: int) -> Note:
+    """Load a note the user owns or collaborates on in one query, or raise 404."""
+    if _cached(user_id, note_id):
+        note = db.get(Note, note_id)
+    else:
+        note = db.query(Note).filter(Note.id == note_id, access_filter(user_id)).first()
+    if note is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=NOT_FOUND)
+    _remember(user_id, note_id)
+    return note
+
+def get_note_state(db: Session, note_id: int, user_id: int):
+    """(id, version_count, updated_at, history_pruned) of an accessible note, without loading its content."""
+    query = db.query(Note.id, Note.version_count, Note.updated_at, Note.history_pruned).filter(Note.id == note_id)
+    if not _cached(user_id, note_id):
+        query = query.filter(access_filter(user_id))
+    state = query.first()
+    if state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=NOT_FOUND)
+    _remember(user_id, note_id)
+    return state
+
+def ensure_note_access(db: Session, note_id: int, user_id: int):
+    """Like get_accessible_note, for handlers that only need the permission check."""
+    if _cached(user_id, note_id):
+        return
+    if not db.query(exists().where(Note.id == note_id, access_filter(user_id))).scalar():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=NOT_FOUND)
+    _remember(user_id, note_id)
+
+def is_collaborator(db: Session, note_id: int, user_id: int) -> bool:
+    return db.query(exists().where(note_collaborators.c.note_id == note_id, note_collaborators.c.user_id == user_id)).scalar()
+
+def add_collaborator(db: Session, note_id: int, user_id: int):
+    db.execute(insert(note_collaborators).values(note_id=note_id, user_id=user_id))
+
+def remove_collaborator(db: Session, note_id: int, user_id: int) -> bool:
+    result = db.execute(delete(note_collaborators).where(note_collaborators.c.note_id == note_id, note_collaborators.c.user_id == user_id))
+    return result.rowcount > 0
+
+def audiences(db: Session, note_ids) -> dict[int, set[int]]:
+    """note_id -> ids of the owner and every collaborator, for many notes in one query."""
+    members = union_all(
+        select(Note.id, Note.owner_id).where(Note.id.in_(note_ids)),
+        select(note_collaborators.c.note_id, note_collaborators.c.user_id).where(note_collaborators.c.note_id.in_(note_ids)),
+    )
+    result = {}
+    for note_id, user_id in db.execute(members):
+        result.setdefault(note_id, set()).add(user_id)
+    return result
+
+def audience(db: Session, note_id: int) -> set[int]:
+    return audiences(db, [note_id]).get(note_id, set())
+
+def forget(note_id: int, user_id: int = None):
+    if user_id is not None:
+        acl_cache.pop((user_id, note_id))
+    else:
+        acl_cache.discard_where(lambda key: key[1] == note_id)
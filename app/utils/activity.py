@@ -0,0 +1,129 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import insert
+from app.config import settings
+from app.database import SessionLocal
+from app.models.activity_log import ActivityLog
+from app.utils import activity_retention
+from app.utils.lazy import Lazy
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+class ActivityLogWriter:
+    """Buffers activity-log rows in memory and writes them in bulk from a background thread.
+
+    When the queue is full, `record` either drops the event ("drop") or waits up to
+    `block_timeout` seconds for room ("block") before dropping it.
+    """
+
+    def __init__(self, session_factory, max_queue: int, batch_size: int, flush_interval: float,
+                 overflow: str = "drop", block_timeout: float = 0.05):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._counters = {"enqueued": 0, "dropped": 0, "written": 0, "flushes": 0, "failed_batches": 0, "failed_rows": 0}
+        self.flush_latency = Histogram()
+
+    def record(self, note_id: int, user_id: int, action: str):
+        row = {"note_id": note_id, "user_id": user_id, "action": action, "timestamp": datetime.utcnow()}
+        try:
+            if self.overflow == "block":
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self._counters["dropped"] += 1
+            return
+        self._counters["enqueued"] += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                started = time.perf_counter()
+                db = self.session_factory()
+                try:
+                    written += self._write(db, batch)
+                finally:
+                    db.close()
+                    self._counters["flushes"] += 1
+                    self.flush_latency.observe(time.perf_counter() - started)
+
+    def _write(self, db, batch: list[dict]) -> int:
+        try:
+            db.execute(insert(ActivityLog), batch)
+            activity_retention.roll_up_late(db, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            if len(batch) == 1:
+                self._counters["failed_rows"] += 1
+                logger.exception("Dropped an activity log row after a failed flush")
+                return 0
+            self._counters["failed_batches"] += 1
+            # Usually one bad row, e.g. for a note deleted while its events were queued: write
+            # the rows one at a time so only the failing ones are dropped.
+            logger.warning("Activity log flush of %d rows failed; retrying row by row", len(batch), exc_info=True)
+            return sum(self._write(db, [row]) for row in batch)
+        self._counters["written"] += len(batch)
+        return len(batch)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            **self._counters,
+            "flush_latency_seconds": self.flush_latency.snapshot(),
+        }
+
+activity_writer = Lazy(lambda: ActivityLogWriter(
+    SessionLocal,
+    max_queue=settings.activity_log_queue_size,
+    batch_size=settings.activity_log_batch_size,
+    flush_interval=settings.activity_log_flush_interval,
+    overflow=settings.activity_log_overflow,
+    block_timeout=settings.activity_log_block_timeout,
+))
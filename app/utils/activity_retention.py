@@ -0,0 +1,264 @@
+import logging
+import threading
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, func, insert, or_, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, advisory_lock
+from app.models.activity_log import ActivityLog, ActivityLogRollup
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.lazy import Lazy
+
+logger = logging.getLogger(__name__)
+
+# Activity-log housekeeping, run by ActivityLogMaintenance in every worker (PostgreSQL takes an
+# advisory lock so only one does the work) or once via `python -m app.utils.activity_retention`:
+#   1. create the monthly partitions of `activity_logs` ahead of time (PostgreSQL only),
+#   2. roll finished days up into `activity_log_rollups` (rows written later for a day already
+#      rolled up are added to it by roll_up_late as they are inserted),
+#   3. prune raw rows past the retention window, by dropping whole partitions where possible
+#      and then deleting in batches. Rows are never pruned before their day is rolled up.
+
+ROLLUP_GRACE = timedelta(minutes=5)  # let the batched writer flush a day's last events
+LOCK_KEY = 7201501  # pg advisory lock id for the maintenance job
+
+PARTITION_PREFIX = "activity_logs_p"
+DEFAULT_PARTITION = "activity_logs_default"
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+def _bounds(month: date) -> str:
+    return f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+def create_partition_sql(month: date) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF activity_logs FOR VALUES {_bounds(month)}"
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('activity_logs')")).first() is not None
+
+def partitions(db: Session) -> list[str]:
+    return db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('activity_logs') ORDER BY c.relname"
+    )).scalars().all()
+
+def _create_partition_from_default(db: Session, month: date):
+    # PostgreSQL refuses a new partition while the default partition holds rows in its range
+    # (maintenance ran late), so those rows move into a plain table that is then attached.
+    name = partition_name(month)
+    db.execute(text(f"CREATE TABLE {name} (LIKE activity_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end "
+        f"RETURNING id, note_id, user_id, action, timestamp) "
+        f"INSERT INTO {name} (id, note_id, user_id, action, timestamp) SELECT * FROM moved"
+    ), {"start": month, "end": add_months(month, 1)})
+    db.execute(text(f"ALTER TABLE activity_logs ATTACH PARTITION {name} FOR VALUES {_bounds(month)}"))
+
+def ensure_partitions(db: Session, today: date) -> int:
+    existing = set(partitions(db))
+    created = 0
+    for offset in range(settings.activity_log_partition_months_ahead + 1):
+        month = add_months(month_start(today), offset)
+        if partition_name(month) not in existing:
+            if DEFAULT_PARTITION in existing and db.execute(text(
+                f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end LIMIT 1"
+            ), {"start": month, "end": add_months(month, 1)}).first():
+                _create_partition_from_default(db, month)
+            else:
+                db.execute(text(create_partition_sql(month)))
+            created += 1
+    return created
+
+def _day(value) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value  # SQLite date() is text
+
+def rollup_watermark(db: Session) -> Optional[date]:
+    """First day not yet rolled up, or None when there is nothing at all."""
+    last = db.query(func.max(ActivityLogRollup.day)).scalar()
+    if last is not None:
+        return _day(last) + timedelta(days=1)
+    first = db.query(func.min(ActivityLog.timestamp)).scalar()
+    return first.date() if first is not None else None
+
+def roll_up(db: Session, now: datetime) -> int:
+    start, end = rollup_watermark(db), (now - ROLLUP_GRACE).date()
+    if start is None or start >= end:
+        return 0
+    day = func.date(ActivityLog.timestamp)
+    counts = select(day, ActivityLog.note_id, ActivityLog.user_id, ActivityLog.action, func.count()).where(
+        ActivityLog.timestamp >= datetime.combine(start, time()), ActivityLog.timestamp < datetime.combine(end, time()),
+    ).group_by(day, ActivityLog.note_id, ActivityLog.user_id, ActivityLog.action)
+    result = db.execute(insert(ActivityLogRollup).from_select(["day", "note_id", "user_id", "action", "count"], counts))
+    return result.rowcount
+
+def roll_up_late(db: Session, rows: list[dict]) -> int:
+    """Add just-inserted rows dated before the rollup watermark to their days' rollups.
+
+    roll_up only reads days from the watermark on, so rows that arrive later for days already
+    rolled up (imported history, a writer flush that lagged behind) are counted here, in the
+    inserting transaction; otherwise prune would delete them without them ever being counted.
+    """
+    last = db.query(func.max(ActivityLogRollup.day)).scalar()
+    if last is None:
+        return 0  # nothing rolled up yet; roll_up starts at the oldest raw row
+    watermark = datetime.combine(_day(last) + timedelta(days=1), time())
+    counts = Counter((row["timestamp"].date(), row["note_id"], row["user_id"], row["action"])
+                     for row in rows if row["timestamp"] < watermark)
+    if not counts:
+        return 0
+    upsert = (postgresql if db.get_bind().dialect.name == "postgresql" else sqlite).insert(ActivityLogRollup)
+    db.execute(upsert.on_conflict_do_update(
+        index_elements=["day", "note_id", "user_id", "action"],
+        set_={"count": ActivityLogRollup.count + upsert.excluded["count"]},
+    ), [{"day": day, "note_id": note_id, "user_id": user_id, "action": action, "count": count}
+        for (day, note_id, user_id, action), count in counts.items()])
+    return len(counts)
+
+def prune(db: Session, now: datetime) -> dict:
+    pruned = {"dropped_partitions": 0, "deleted": 0}
+    if settings.activity_log_retention_days <= 0:
+        return pruned
+    watermark = rollup_watermark(db)
+    if watermark is None:
+        return pruned
+    cutoff = datetime.combine(min(now.date() - timedelta(days=settings.activity_log_retention_days), watermark), time())
+    if is_partitioned(db):
+        for name in partitions(db):
+            if not name.startswith(PARTITION_PREFIX):
+                continue  # the default partition
+            month = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m").date()
+            if datetime.combine(add_months(month, 1), time()) <= cutoff:
+                db.execute(text(f"DROP TABLE {name}"))
+                pruned["dropped_partitions"] += 1
+        db.commit()
+    while True:
+        batch = select(ActivityLog.id).where(ActivityLog.timestamp < cutoff).limit(settings.activity_log_prune_batch).scalar_subquery()
+        deleted = db.execute(delete(ActivityLog).where(ActivityLog.timestamp < cutoff, ActivityLog.id.in_(batch)),
+                             execution_options={"synchronize_session": False}).rowcount
+        db.commit()
+        pruned["deleted"] += deleted
+        if deleted < settings.activity_log_prune_batch:
+            return pruned
+
+def run_maintenance(session_factory=SessionLocal, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.utcnow()
+    db = session_factory()
+    try:
+        with advisory_lock(db.get_bind(), LOCK_KEY) as locked:
+            if not locked:
+                return {"skipped": True}
+            result = {"created_partitions": ensure_partitions(db, now.date()) if is_partitioned(db) else 0}
+            result["rolled_up"] = roll_up(db, now)
+            db.commit()
+            result.update(prune(db, now))
+            return result
+    finally:
+        db.close()
+
+def summarize(db: Session, note_id: int, limit: int, cursor: Optional[str]):
+    """Daily (user, action) counts for a note, newest day first: rollups plus the live tail.
+
+    Returns (rows, next_cursor). Days from the rollup watermark on are aggregated from the raw
+    rows, which only covers the last day or two once maintenance runs.
+    """
+    def key(day: date, action: str, user_id: int):
+        return (-day.toordinal(), action, user_id)
+
+    after = None
+    if cursor:
+        cursor_day, action, user_id = decode_cursor(cursor, 3)
+        try:
+            after = (date.fromisoformat(cursor_day), str(action), int(user_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    watermark = db.query(func.max(ActivityLogRollup.day)).scalar()
+    watermark = _day(watermark) + timedelta(days=1) if watermark is not None else None
+    day = func.date(ActivityLog.timestamp)
+    live = select(day, ActivityLog.user_id, ActivityLog.action, func.count()).where(ActivityLog.note_id == note_id)
+    if watermark is not None:
+        live = live.where(ActivityLog.timestamp >= datetime.combine(watermark, time()))
+    rows = [{"day": _day(row[0]), "user_id": row[1], "action": row[2], "count": row[3]}
+            for row in db.execute(live.group_by(day, ActivityLog.user_id, ActivityLog.action))]
+    rows = sorted((row for row in rows if after is None or key(row["day"], row["action"], row["user_id"]) > key(*after)),
+                  key=lambda row: key(row["day"], row["action"], row["user_id"]))
+
+    if len(rows) <= limit and watermark is not None:
+        rolled = select(ActivityLogRollup.day, ActivityLogRollup.user_id, ActivityLogRollup.action, ActivityLogRollup.count).where(
+            ActivityLogRollup.note_id == note_id, ActivityLogRollup.day < watermark)
+        if after is not None:
+            rolled = rolled.where(or_(ActivityLogRollup.day < after[0], and_(ActivityLogRollup.day == after[0], or_(
+                ActivityLogRollup.action > after[1], and_(ActivityLogRollup.action == after[1], ActivityLogRollup.user_id > after[2])))))
+        rolled = rolled.order_by(ActivityLogRollup.day.desc(), ActivityLogRollup.action, ActivityLogRollup.user_id).limit(limit + 1 - len(rows))
+        rows += [{"day": _day(row[0]), "user_id": row[1], "action": row[2], "count": row[3]} for row in db.execute(rolled)]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["day"].isoformat(), last["action"], last["user_id"])
+    return rows, next_cursor
+
+class ActivityLogMaintenance:
+    """Runs run_maintenance every `interval` seconds on a background thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+        self._counters = {"runs": 0, "failed_runs": 0, "rolled_up": 0, "deleted": 0, "dropped_partitions": 0}
+        self.last_run = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-log-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def run_once(self) -> dict:
+        try:
+            result = run_maintenance()
+        except Exception:
+            self._counters["failed_runs"] += 1
+            logger.exception("Activity log maintenance failed")
+            return {}
+        self._counters["runs"] += 1
+        for key in ("rolled_up", "deleted", "dropped_partitions"):
+            self._counters[key] += result.get(key, 0)
+        self.last_run = datetime.utcnow()
+        return result
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self.run_once()
+
+    def stats(self) -> dict:
+        return {**self._counters, "last_run": self.last_run}
+
+activity_maintenance = Lazy(lambda: ActivityLogMaintenance(settings.activity_log_maintenance_interval))
+
+if __name__ == "__main__":
+    from app.models import note, user, version  # noqa: F401  (mappers for the relationships)
+    print(run_maintenance())
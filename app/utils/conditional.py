@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Response, status
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.note import Note
+from app.utils import versioning
+
+# ETags are derived from metadata only (id, version counter, updated_at), so a conditional
+# request can be answered without reading the content column.
+
+def note_etag(note_id: int, version_count: int, updated_at: datetime) -> str:
+    return f'"n{note_id}.{version_count}.{updated_at:%Y%m%d%H%M%S%f}"'
+
+def versions_etag(note_id: int, version_count: int, history_pruned: int) -> str:
+    return f'"v{note_id}.{version_count}.{history_pruned}"'
+
+def version_etag(note_id: int, version_number: int, version_id: int) -> str:
+    return f'"v{note_id}.{version_number}.{version_id}"'  # versions are immutable
+
+def matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match / If-Match header value."""
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+def precondition_failed():
+    raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Note was modified since it was fetched")
+
+def claim_version(db: Session, note: Note, if_match: Optional[str]) -> int:
+    """Check If-Match against `note` and claim its next version number.
+
+    The check is repeated on the counter claim itself: the UPDATE serializes writers on the
+    note row, so a write committed after `note` was loaded shows up as a skipped number.
+    """
+    expected = note.version_count + 1
+    if if_match is not None and not matches(if_match, note_etag(note.id, note.version_count, note.updated_at)):
+        precondition_failed()
+    number = versioning.next_version_number(db, note.id)
+    if if_match is not None and if_match.strip() != "*" and number != expected:
+        precondition_failed()
+    if settings.edit_coalesce_window > 0:
+        # Coalesced edits change the note without claiming a number. Now that the row lock is
+        # held, one that landed after `note` was loaded shows up in updated_at; the new
+        # version must hold the content it wrote.
+        if db.query(Note.updated_at).filter(Note.id == note.id).scalar() != note.updated_at:
+            if if_match is not None and if_match.strip() != "*":
+                precondition_failed()
+            db.refresh(note, ["title", "content", "updated_at"])
+    return number
@@ -0,0 +1,139 @@
+import re
+from difflib import SequenceMatcher
+from app.config import settings
+from app.utils.cache import LRUCache
+from app.utils.lazy import Lazy
+
+# Server-side version diffs. Lines are interned to ints and the common prefix and suffix are
+# cut off before running SequenceMatcher, so the matcher only sees the changed middle of the
+# note; the response holds only the changed hunks plus `context` unchanged lines around them.
+# Versions are immutable, so results are cached per (note, from, to, granularity, context).
+
+WORD_REFINE_LIMIT = 10000  # characters in a replaced block; larger blocks stay line-level
+_TOKENS = re.compile(r"\s+|\w+|[^\w\s]")
+
+_cache = Lazy(lambda: LRUCache(settings.diff_cache_size))
+
+def _opcodes(a: list, b: list) -> list[tuple]:
+    """Full-length opcodes for a -> b, computed on the part between common prefix and suffix."""
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[len(a) - 1 - suffix] == b[len(b) - 1 - suffix]:
+        suffix += 1
+    ops = [("equal", 0, prefix, 0, prefix)] if prefix else []
+    middle_a, middle_b = a[prefix:len(a) - suffix], b[prefix:len(b) - suffix]
+    if middle_a or middle_b:
+        ids = {}
+        matcher = SequenceMatcher(None, [ids.setdefault(item, len(ids)) for item in middle_a],
+                                  [ids.setdefault(item, len(ids)) for item in middle_b])
+        ops += [(tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix) for tag, i1, i2, j1, j2 in matcher.get_opcodes()]
+    if suffix:
+        ops.append(("equal", len(a) - suffix, len(a), len(b) - suffix, len(b)))
+    return ops
+
+def _grouped(ops: list[tuple], context: int) -> list[list[tuple]]:
+    """Split opcodes into hunks with at most `context` equal items around each change
+    (SequenceMatcher.get_grouped_opcodes over precomputed opcodes)."""
+    if not ops:
+        return []
+    ops = list(ops)
+    if ops[0][0] == "equal":
+        tag, i1, i2, j1, j2 = ops[0]
+        ops[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if ops[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = ops[-1]
+        ops[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    groups, group = [], []
+    for tag, i1, i2, j1, j2 in ops:
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    groups.append(group)
+    return [group for group in groups if any(tag != "equal" for tag, *_ in group)]
+
+def _segments(old: str, new: str) -> tuple[list[dict], list[dict]]:
+    a, b = _TOKENS.findall(old), _TOKENS.findall(new)
+    left, right = [], []
+    for tag, i1, i2, j1, j2 in _opcodes(a, b):
+        if tag == "equal":
+            left.append({"op": "equal", "text": "".join(a[i1:i2])})
+            right.append({"op": "equal", "text": "".join(b[j1:j2])})
+            continue
+        if i2 > i1:
+            left.append({"op": "delete", "text": "".join(a[i1:i2])})
+        if j2 > j1:
+            right.append({"op": "insert", "text": "".join(b[j1:j2])})
+    return left, right
+
+def _rows(tag, i1, i2, j1, j2, a: list[str], b: list[str], words: bool) -> list[dict]:
+    if tag == "equal":
+        return [{"op": "equal", "left": {"line": i + 1, "text": a[i]}, "right": {"line": j + 1, "text": b[j]}}
+                for i, j in zip(range(i1, i2), range(j1, j2))]
+    rows = []
+    refine = words and tag == "replace" and sum(map(len, a[i1:i2])) + sum(map(len, b[j1:j2])) <= WORD_REFINE_LIMIT
+    for offset in range(max(i2 - i1, j2 - j1)):
+        i, j = i1 + offset, j1 + offset
+        left = {"line": i + 1, "text": a[i]} if i < i2 else None
+        right = {"line": j + 1, "text": b[j]} if j < j2 else None
+        if left and right and refine:
+            left["segments"], right["segments"] = _segments(left["text"], right["text"])
+        rows.append({"op": "replace" if left and right else ("delete" if left else "insert"), "left": left, "right": right})
+    return rows
+
+def diff_texts(old: str, new: str, granularity: str = "line", context: int = 3) -> dict:
+    """Side-by-side hunks for old -> new; each row pairs a left (old) and right (new) line."""
+    a, b = old.splitlines(), new.splitlines()
+    ops = _opcodes(a, b)
+    hunks = []
+    for group in _grouped(ops, context):
+        _, i1, _, j1, _ = group[0]
+        _, _, i2, _, j2 = group[-1]
+        rows = [row for op in group for row in _rows(*op, a, b, granularity == "word")]
+        hunks.append({"old_start": i1 + 1, "old_lines": i2 - i1, "new_start": j1 + 1, "new_lines": j2 - j1, "rows": rows})
+    return {
+        "added": sum(j2 - j1 for tag, i1, i2, j1, j2 in ops if tag in ("insert", "replace")),
+        "removed": sum(i2 - i1 for tag, i1, i2, j1, j2 in ops if tag in ("delete", "replace")),
+        "hunks": hunks,
+    }
+
+def _range(start: int, length: int) -> str:
+    if length == 1:
+        return str(start)
+    return f"{start - 1 if length == 0 else start},{length}"  # an empty range names the line before
+
+def unified(diff: dict, from_label: str, to_label: str) -> str:
+    """Render diff_texts output as a unified diff (`diff -u` / `git diff` format)."""
+    lines = [f"--- {from_label}", f"+++ {to_label}"]
+    for hunk in diff["hunks"]:
+        lines.append(f"@@ -{_range(hunk['old_start'], hunk['old_lines'])} +{_range(hunk['new_start'], hunk['new_lines'])} @@")
+        deleted, inserted = [], []
+        for row in hunk["rows"]:
+            if row["op"] == "equal":
+                lines += deleted + inserted + [" " + row["left"]["text"]]
+                deleted, inserted = [], []
+                continue
+            if row["left"]:
+                deleted.append("-" + row["left"]["text"])
+            if row["right"]:
+                inserted.append("+" + row["right"]["text"])
+        lines += deleted + inserted
+    return "\n".join(lines) + "\n"
+
+def cached_diff(key: tuple, compute) -> dict:
+    diff = _cache.get(key)
+    if diff is None:
+        diff = compute()
+        _cache.set(key, diff)
+    return diff
+
+def forget_note(note_id: int):
+    _cache.discard_where(lambda key: key[0] == note_id)
+
+def stats() -> dict:
+    return _cache.stats()
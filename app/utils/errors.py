@@ -1,14 +1,16 @@
 from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import IntegrityError
+from app.auth.utils import PasswordHasherBusy
 
 def add_exception_handlers(app):
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
         return JSONResponse(
             status_code=422,
-            content={"detail": "Validation error", "errors": exc.errors()},
+            content={"detail": "Validation error", "errors": jsonable_encoder(exc.errors())},  # ctx may hold the raised ValueError
         )
 
     @app.exception_handler(IntegrityError)
@@ -18,9 +20,18 @@ def add_exception_handlers(app):
             content={"detail": "Database integrity error, possibly duplicate or constraint violation"},
         )
 
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Authentication is temporarily overloaded, retry shortly"},
+            headers={"Retry-After": "1"},
+        )
+
     @app.exception_handler(HTTPException)
     async def http_exception_handler(request: Request, exc: HTTPException):
         return JSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.detail},
+            headers=exc.headers,
         )
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import json
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.utils import access
+from app.utils.lazy import Lazy
+
+class Broker:
+    """Carries note events between workers.
+
+    `publish` may be called from any thread. Every event published by any worker, including
+    this one, must be handed to the `deliver` callback given to `start`; `deliver` is
+    thread-safe. A networked broker (Redis, Postgres LISTEN/NOTIFY, ...) sets `remote` so
+    publishers do not skip events when this worker has no local subscribers.
+    """
+    remote = False
+
+    def start(self, deliver):
+        raise NotImplementedError
+
+    def publish(self, event: dict):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+class LocalBroker(Broker):
+    """Single-process broker: events go straight to this worker's hub."""
+
+    def __init__(self):
+        self._deliver = None
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, event: dict):
+        if self._deliver is not None:
+            self._deliver(event)
+
+class Subscription:
+    def __init__(self, user_id: int, max_queue: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False  # fell behind; the stream ends and the client must resync
+
+class EventHub:
+    """Fans note events out to the SSE connections of this worker.
+
+    Each connection owns a bounded queue. A consumer that lets its queue fill up is marked
+    dropped instead of buffering without limit or slowing down delivery to everyone else.
+    """
+
+    def __init__(self, broker: Broker, max_queue: int):
+        self.broker = broker
+        self.max_queue = max_queue
+        self._loop = None
+        self._subscriptions: dict[int, set[Subscription]] = {}
+        self._ids = itertools.count(1)
+        self._counters = {"published": 0, "delivered": 0, "dropped_consumers": 0}
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.broker.start(self._deliver_threadsafe)
+
+    def stop(self):
+        self.broker.stop()
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                self._drop(subscription)
+        self._loop = None
+
+    def listening(self) -> bool:
+        return self.broker.remote or bool(self._subscriptions)
+
+    def publish(self, event: dict):
+        self._counters["published"] += 1
+        self.broker.publish(event)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.max_queue)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    async def stream(self, subscription: Subscription):
+        """Server-Sent Events for one connection; ends when the subscriber is dropped."""
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.stream_keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscription.dropped:
+                    yield f"event: resync\ndata: {json.dumps({'at': datetime.utcnow().isoformat()})}\n\n"
+                    return
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscription)
+
+    def _deliver_threadsafe(self, event: dict):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: dict):
+        event = {**event, "id": next(self._ids)}
+        for user_id in event["audience"]:
+            for subscription in list(self._subscriptions.get(user_id, ())):
+                try:
+                    subscription.queue.put_nowait(event)
+                    self._counters["delivered"] += 1
+                except asyncio.QueueFull:
+                    self._counters["dropped_consumers"] += 1
+                    self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        subscription.dropped = True
+        self.unsubscribe(subscription)
+        try:
+            subscription.queue.put_nowait(None)  # wake the stream if it is idle
+        except asyncio.QueueFull:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "subscribers": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+            "broker": type(self.broker).__name__,
+        }
+
+hub = Lazy(lambda: EventHub(LocalBroker(), settings.stream_queue_size))
+
+def notify(db: Session, kind: str, note_id: int, actor_id: int, audience: Optional[set[int]] = None, **data):
+    """Publish a note event after commit. The audience is resolved only if anyone listens."""
+    if not hub.listening():
+        return
+    if audience is None:
+        audience = access.audience(db, note_id)
+    hub.publish({"type": kind, "note_id": note_id, "actor_id": actor_id, "audience": sorted(audience), **data})
+
+def format_event(event: dict) -> str:
+    data = {key: value for key, value in event.items() if key not in ("id", "type", "audience")}
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,172 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from app.config import settings
+from app.utils.metrics import DEFAULT_BUCKETS, Histogram
+
+# Per-request SQL accounting. Engine event hooks time every statement and add it to the
+# QueryStats of the request being served, found through a context variable that follows the
+# request into the threadpool (run_in_threadpool copies the context) and into
+# AsyncSession.run_sync. RequestMetricsMiddleware reports the totals in a Server-Timing header,
+# a log record and the per-route histograms served as Prometheus text by GET /metrics.
+
+request_logger = logging.getLogger("app.requests")
+slow_query_logger = logging.getLogger("app.sql")
+
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: list[tuple[float, str]] = []  # longest first
+
+    def record(self, seconds: float, statement: str):
+        self.count += 1
+        self.seconds += seconds
+        keep = settings.request_slowest_queries
+        if keep and (len(self.slowest) < keep or seconds > self.slowest[-1][0]):
+            self.slowest.append((seconds, statement))
+            self.slowest.sort(key=lambda item: -item[0])
+            del self.slowest[keep:]
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_captures: list[QueryStats] = []
+_captures_lock = Lock()
+
+def _observe(seconds: float, statement: str):
+    stats = _current.get()
+    if stats is not None:
+        stats.record(seconds, statement)
+    if _captures:
+        with _captures_lock:
+            for capture in _captures:
+                capture.record(seconds, statement)
+    threshold = settings.slow_query_threshold
+    if threshold > 0 and seconds >= threshold:
+        slow_query_logger.warning("slow query %.1f ms: %s", seconds * 1000, statement,
+                                  extra={"duration_ms": round(seconds * 1000, 3), "statement": statement})
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        _observe(time.perf_counter() - conn.info["query_started"].pop(), statement)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            _observe(time.perf_counter() - started.pop(), context.statement or "")
+
+@contextmanager
+def capture_queries():
+    """Collect every statement run on any thread while the block runs; for query-count tests."""
+    stats = QueryStats()
+    with _captures_lock:
+        _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        with _captures_lock:
+            _captures.remove(stats)
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+def _histogram_lines(name: str, labels: dict, snapshot: dict) -> list[str]:
+    lines = [f"{name}_bucket{{{_labels(**labels, le=bound)}}} {count}" for bound, count in snapshot["buckets"].items()]
+    lines.append(f"{name}_sum{{{_labels(**labels)}}} {snapshot['sum']}")
+    lines.append(f"{name}_count{{{_labels(**labels)}}} {snapshot['count']}")
+    return lines
+
+class RequestMetrics:
+    """Latency and query histograms per (method, route template); unmatched paths share one label."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: QueryStats):
+        key = (method, route)
+        with self._lock:
+            entry = self._routes.get(key)
+            if entry is None:
+                entry = self._routes[key] = {"latency": Histogram(DEFAULT_BUCKETS), "queries": Histogram(QUERY_BUCKETS),
+                                             "db_seconds": 0.0, "statuses": {}}
+            entry["db_seconds"] += stats.seconds
+            entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+        entry["latency"].observe(seconds)
+        entry["queries"].observe(stats.count)
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+        lines = ["# HELP http_request_duration_seconds Request latency by route.",
+                 "# TYPE http_request_duration_seconds histogram"]
+        for (method, route), entry in routes:
+            lines += _histogram_lines("http_request_duration_seconds", {"method": method, "route": route}, entry["latency"].snapshot())
+        lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+        for (method, route), entry in routes:
+            lines += [f"http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}"
+                      for status, count in sorted(entry["statuses"].items())]
+        lines += ["# HELP db_queries_per_request SQL statements per request by route.", "# TYPE db_queries_per_request histogram"]
+        for (method, route), entry in routes:
+            lines += _histogram_lines("db_queries_per_request", {"method": method, "route": route}, entry["queries"].snapshot())
+        lines += ["# HELP db_query_seconds_total Time spent in SQL statements by route.", "# TYPE db_query_seconds_total counter"]
+        for (method, route), entry in routes:
+            lines.append(f"db_query_seconds_total{{{_labels(method=method, route=route)}}} {entry['db_seconds']}")
+        return "\n".join(lines) + "\n"
+
+request_metrics = RequestMetrics()
+
+def server_timing(stats: QueryStats, seconds: float) -> str:
+    return f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries", app;dur={seconds * 1000:.1f}'
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are passed through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.request_metrics:
+            return await self.app(scope, receive, send)
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", server_timing(stats, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            seconds = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", "unmatched")  # set by FastAPI's router
+            request_metrics.observe(scope["method"], route, status, seconds, stats)
+            if request_logger.isEnabledFor(logging.INFO):
+                request_logger.info(
+                    "%s %s %d %.1f ms, %d queries in %.1f ms", scope["method"], route, status, seconds * 1000, stats.count, stats.seconds * 1000,
+                    extra={"method": scope["method"], "route": route, "path": scope["path"], "status": status,
+                           "duration_ms": round(seconds * 1000, 3), "queries": stats.count, "db_ms": round(stats.seconds * 1000, 3),
+                           "slowest_queries": [{"duration_ms": round(duration * 1000, 3), "statement": statement}
+                                               for duration, statement in stats.slowest]},
+                )
@@ -0,0 +1,29 @@
+import threading
+
+class Lazy:
+    """Module-level singleton built by `factory` on first use, so importing its module does not
+    read settings. Attribute reads and writes go to the built object."""
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "_target", None)
+
+    def _get(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                target = self._target
+                if target is None:
+                    target = self._factory()
+                    object.__setattr__(self, "_target", target)
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+    def __len__(self):
+        return len(self._get())
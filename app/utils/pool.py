@@ -0,0 +1,47 @@
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool
+from app.utils.metrics import Histogram
+
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = Histogram(WAIT_BUCKETS)
+        self.pool_class = None
+        self.pool = None
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        stats = {"pool_class": self.pool_class, "checkouts": self.checkouts, "timeouts": self.timeouts,
+                 "wait_seconds": self.wait_seconds.snapshot()}
+        if pool is not None and not isinstance(pool, NullPool):
+            stats.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+class _TimedCheckout:
+    """Records how long each checkout waited for a connection (including connecting)."""
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics.pool = self
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.checkouts += 1
+            self.metrics.wait_seconds.observe(time.perf_counter() - started)
+
+def instrumented(pool_class, metrics: PoolMetrics):
+    # A subclass per engine, so Pool.recreate() (which rebuilds from the class) keeps reporting.
+    metrics.pool_class = pool_class.__name__
+    return type(f"Instrumented{pool_class.__name__}", (_TimedCheckout, pool_class), {"metrics": metrics})
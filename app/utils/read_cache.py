@@ -0,0 +1,159 @@
+import fnmatch
+from threading import Lock
+from typing import Optional
+from fastapi import Response
+from app.config import settings
+from app.utils.cache import SizedLRUCache
+from app.utils.lazy import Lazy
+
+# Read-through cache of serialized GET responses: notes under `note:{id}` and versions, which
+# are immutable until compaction removes them, under `version:{note_id}:{number}:{pruned}`. An entry is the ETag and the JSON body,
+# so a hit skips loading the row and Pydantic serialization. Writers drop entries after commit.
+#
+# A cached note is only served while its ETag still matches the note's metadata columns: the
+# default backend lives in each worker and never sees other workers' writes, and a shared
+# backend (Redis) can miss an invalidation or be filled by a read that raced a write. Version
+# keys carry history_pruned, so compaction needs no invalidation. A shared backend therefore
+# never scans for a deleted note's versions (they are behind its failing access check); they
+# expire after read_cache_ttl seconds like every other entry.
+
+class CacheBackend:
+    """Stores bytes by str key. A `shared` backend is the same store for every worker."""
+    shared = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+class LocalBackend(CacheBackend):
+    def __init__(self, max_bytes: int):
+        self._cache = SizedLRUCache(max_bytes)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: bytes):
+        self._cache.set(key, value)
+
+    def delete(self, key: str):
+        self._cache.pop(key)
+
+    def delete_prefix(self, prefix: str):
+        self._cache.discard_where(lambda key: key.startswith(prefix))
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        return {"size": stats["size"], "bytes": stats["bytes"], "max_bytes": stats["max_bytes"], "evictions": stats["evictions"]}
+
+class RedisBackend(CacheBackend):
+    """Keeps entries in Redis through any redis-py compatible client."""
+    shared = True
+
+    def __init__(self, client, ttl: float, namespace: str = "notes-api:"):
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.namespace + key)
+
+    def set(self, key: str, value: bytes):
+        self.client.set(self.namespace + key, value, ex=int(self.ttl) or None)
+
+    def delete(self, key: str):
+        self.client.delete(self.namespace + key)
+
+    def delete_prefix(self, prefix: str):
+        keys = list(self.client.scan_iter(match=self.namespace + prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class MemoryClient:
+    """In-process stand-in for the redis-py client calls RedisBackend makes; for tests."""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self._lock = Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self.data[key] = value
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self.data) if fnmatch.fnmatchcase(key, match)]
+
+def note_key(note_id: int) -> str:
+    return f"note:{note_id}"
+
+def version_key(note_id: int, version_number: int, pruned: int = 0) -> str:
+    """`pruned` is the note's history_pruned count, so entries of a compacted history go unused."""
+    return f"version:{note_id}:{version_number}:{pruned}"
+
+class ReadCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[tuple[str, bytes]]:
+        """(etag, body) or None."""
+        if settings.read_cache_max_bytes <= 0:
+            return None
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        etag, body = value.split(b"\n", 1)
+        return etag.decode(), body
+
+    def set(self, key: str, etag: str, body: bytes):
+        if settings.read_cache_max_bytes > 0:
+            self.backend.set(key, etag.encode() + b"\n" + body)
+
+    def forget(self, key: str):
+        self.backend.delete(key)
+
+    def forget_note(self, note_id: int):
+        """Drop a deleted note and, in a local backend, all of its versions."""
+        self.backend.delete(note_key(note_id))
+        if not self.backend.shared:
+            self.backend.delete_prefix(f"version:{note_id}:")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"backend": type(self.backend).__name__, "hits": self.hits, "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None, **self.backend.stats()}
+
+def response(etag: str, body: bytes) -> Response:
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+def _backend() -> CacheBackend:
+    if settings.read_cache_backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("READ_CACHE_BACKEND=redis needs the redis package")
+        return RedisBackend(redis.Redis.from_url(settings.read_cache_url), settings.read_cache_ttl)
+    return LocalBackend(settings.read_cache_max_bytes)
+
+read_cache = Lazy(lambda: ReadCache(_backend()))
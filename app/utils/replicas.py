@@ -0,0 +1,195 @@
+import logging
+import threading
+import time
+from itertools import count
+from typing import Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config import settings
+from app.database import ASYNC_DRIVERS, engine_options, pool_metrics
+from app.utils.cache import LRUCache
+from app.utils.instrumentation import instrument_engine
+from app.utils.lazy import Lazy
+from app.utils.pool import PoolMetrics
+from app.utils.read_cache import read_cache
+
+logger = logging.getLogger(__name__)
+
+# Read-replica routing. get_current_user routes the session of a GET/HEAD request to a healthy
+# replica (round robin) unless its user committed a write within the last
+# replica_read_your_writes seconds; everything else, and every flush or DML statement, stays
+# on the primary (_SyncSession/_AsyncBackedSession.get_bind). A background thread checks each
+# replica every replica_health_interval seconds, and a replica that drops a connection is
+# taken out until its next successful check, so reads fall back to the primary.
+#
+# Recent writers are remembered per worker; with the redis read cache they are also recorded
+# there, so a user's next read on another worker still goes to the primary.
+
+READ_METHODS = ("GET", "HEAD")
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.healthy = False  # until the first check passes
+        self.lag: Optional[float] = None
+        self.failures = 0
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def _create(self, kind: str):
+        metrics = pool_metrics.setdefault(f"{self.name}_{kind}", PoolMetrics())
+        if kind == "async":
+            url = make_url(self.url)
+            url = url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+            engine = create_async_engine(url, **engine_options(url, AsyncAdaptedQueuePool, metrics))
+            sync_engine = engine.sync_engine
+        else:
+            engine = sync_engine = create_engine(self.url, **engine_options(self.url, QueuePool, metrics))
+        instrument_engine(sync_engine)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _failed(context):
+            if context.is_disconnect and self.healthy:
+                logger.warning("Replica %s disconnected; reading from the primary", self.name)
+                self.healthy = False
+        return engine
+
+    def engine(self, kind: str = "sync"):
+        engine = self._engines.get(kind)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(kind)
+                if engine is None:
+                    engine = self._engines[kind] = self._create(kind)
+        return engine
+
+    def check(self):
+        try:
+            with self.engine().connect() as connection:
+                connection.execute(text("SELECT 1"))
+                lag = 0.0
+                if connection.dialect.name == "postgresql":
+                    # NULL on a server that is not replaying WAL, i.e. not a standby
+                    lag = connection.execute(text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    )).scalar()
+        except Exception:
+            if self.healthy:
+                logger.warning("Replica %s failed its health check", self.name, exc_info=True)
+            self.healthy = False
+            self.failures += 1
+            return
+        self.lag = float(lag)
+        self.healthy = settings.replica_max_lag <= 0 or self.lag <= settings.replica_max_lag
+
+    async def dispose(self):
+        engines, self._engines = self._engines, {}
+        if "async" in engines:
+            await engines["async"].dispose()
+        if "sync" in engines:
+            engines["sync"].dispose()
+
+class ReplicaSet:
+    def __init__(self):
+        self._replicas: Optional[list[Replica]] = None
+        self._next = count()
+        self._writers = Lazy(lambda: LRUCache(settings.principal_cache_size))
+        self._stopping = threading.Event()
+        self._thread = None
+        self.routed = 0
+        self.primary_reads = 0
+
+    @property
+    def replicas(self) -> list[Replica]:
+        if self._replicas is None:
+            self._replicas = [Replica(f"replica{index}", url) for index, url in enumerate(settings.replica_urls)]
+        return self._replicas
+
+    def check(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def start(self):
+        if self._thread is not None or not self.replicas:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        self.check()
+        while not self._stopping.wait(settings.replica_health_interval):
+            self.check()
+
+    async def dispose(self):
+        replicas, self._replicas = self._replicas or [], None
+        for replica in replicas:
+            await replica.dispose()
+
+    def wrote(self, user_id: int):
+        window = settings.replica_read_your_writes
+        if window <= 0 or not self.replicas:
+            return
+        until = time.time() + window
+        self._writers.set(user_id, until)
+        if read_cache.backend.shared:
+            read_cache.backend.set(f"wrote:{user_id}", str(until).encode())
+
+    def recently_wrote(self, user_id: int) -> bool:
+        now = time.time()
+        until = self._writers.get(user_id)
+        if until is None and read_cache.backend.shared:
+            value = read_cache.backend.get(f"wrote:{user_id}")
+            until = float(value) if value is not None else None
+        return until is not None and until > now
+
+    def engine_for(self, user_id: int, kind: str = "sync"):
+        """A healthy replica's engine for this user's reads, or None for the primary."""
+        if not self.replicas:
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy or self.recently_wrote(user_id):
+            self.primary_reads += 1
+            return None
+        self.routed += 1
+        engine = healthy[next(self._next) % len(healthy)].engine(kind)
+        return engine.sync_engine if kind == "async" else engine
+
+    def stats(self) -> dict:
+        return {
+            "routed": self.routed, "primary_reads": self.primary_reads,
+            "replicas": {replica.name: {"healthy": replica.healthy, "lag": replica.lag, "failures": replica.failures}
+                         for replica in self.replicas},
+        }
+
+replica_set = ReplicaSet()
+
+def route(db, method: str, user_id: int):
+    """Send this request's reads to a replica, or remember that its user writes."""
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    if method in READ_METHODS:
+        engine = replica_set.engine_for(user_id, "async" if isinstance(db, AsyncSession) else "sync")
+        if engine is not None:
+            session.info["replica"] = engine
+    else:
+        session.info["writer"] = user_id
+
+def on_replica(db: Session) -> bool:
+    return db.info.get("replica") is not None
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    writer = session.info.get("writer")
+    if writer is not None:
+        replica_set.wrote(writer)
@@ -0,0 +1,99 @@
+import re
+from typing import Optional
+from sqlalchemy import text, DateTime, Float, func, literal, or_, select
+from sqlalchemy.orm import Session
+from app.models.note import Note, PG_SEARCH_VECTOR
+from app.utils.access import access_filter
+from app.utils.pagination import encode_cursor, decode_cursor
+
+ACCESS_FILTER = (
+    "(n.owner_id = :user_id OR EXISTS "
+    "(SELECT 1 FROM note_collaborators nc WHERE nc.note_id = n.id AND nc.user_id = :user_id))"
+)
+
+# Ranking is computed for matching rows only; headlines are built after the page is cut so
+# the expensive ts_headline call runs at most `limit` times.
+PG_SEARCH_SQL = """
+SELECT m.id, m.title, m.owner_id, m.created_at, m.updated_at, m.rank,
+       ts_headline('english', m.content, plainto_tsquery('english', :query),
+                   'StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=20, MinWords=5') AS snippet
+FROM (
+    SELECT n.id, n.title, n.content, n.owner_id, n.created_at, n.updated_at,
+           ts_rank_cd({vector}, q)::float8 AS rank
+    FROM notes n, plainto_tsquery('english', :query) q
+    -- the index expression itself (its columns are unambiguous here), so the GIN index is used
+    WHERE {vector} @@ q AND {access} {keyset}
+    ORDER BY rank DESC, n.id DESC
+    LIMIT :limit
+) m
+ORDER BY m.rank DESC, m.id DESC
+"""
+# float8 on both sides: a real sent back through the cursor would not compare equal to itself
+PG_KEYSET = "AND (ts_rank_cd({vector}, q)::float8 < :rank OR (ts_rank_cd({vector}, q)::float8 = :rank AND n.id < :last_id))"
+
+# bm25() returns lower-is-better scores; the title column is weighted above the body.
+SQLITE_SEARCH_SQL = """
+SELECT n.id, n.title, n.owner_id, n.created_at, n.updated_at, m.rank, m.snippet
+FROM (
+    SELECT rowid AS id, bm25(notes_fts, 10.0, 1.0) AS rank,
+           snippet(notes_fts, -1, '<b>', '</b>', '...', 16) AS snippet
+    FROM notes_fts WHERE notes_fts MATCH :query
+) m JOIN notes n ON n.id = m.id
+WHERE {access} {keyset}
+ORDER BY m.rank, n.id DESC
+LIMIT :limit
+"""
+SQLITE_KEYSET = "AND (m.rank > :rank OR (m.rank = :rank AND n.id < :last_id))"
+
+def _fts5_query(query: str) -> Optional[str]:
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+def _search_like(db: Session, user_id: int, query: str, limit: int, cursor: Optional[str]):
+    """Substring match, newest id first, for databases without a full-text index here.
+
+    Every row ranks 0, so the (rank, id) cursor pages by id alone.
+    """
+    pattern = "%" + re.sub(r"([\\%_])", r"\\\1", query) + "%"
+    statement = select(Note.id, Note.title, Note.owner_id, Note.created_at, Note.updated_at,
+                       literal(0.0).label("rank"), func.substr(Note.content, 1, 200).label("snippet")).where(
+        or_(Note.title.ilike(pattern, escape="\\"), Note.content.ilike(pattern, escape="\\")), access_filter(user_id))
+    if cursor:
+        statement = statement.where(Note.id < decode_cursor(cursor, 2)[1])
+    rows = [dict(row) for row in db.execute(statement.order_by(Note.id.desc()).limit(limit + 1)).mappings()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(0.0, rows[-1]["id"])
+    return rows, next_cursor
+
+def search_notes(db: Session, user_id: int, query: str, limit: int, cursor: Optional[str] = None):
+    dialect = db.get_bind().dialect.name
+    params = {"user_id": user_id, "limit": limit + 1, "query": query}
+    if cursor:
+        params["rank"], params["last_id"] = decode_cursor(cursor, 2)
+    if dialect == "postgresql":
+        keyset = PG_KEYSET.format(vector=PG_SEARCH_VECTOR) if cursor else ""
+        sql = PG_SEARCH_SQL.format(vector=PG_SEARCH_VECTOR, access=ACCESS_FILTER, keyset=keyset)
+    elif dialect == "sqlite":
+        params["query"] = _fts5_query(query)
+        if params["query"] is None:
+            return [], None
+        sql = SQLITE_SEARCH_SQL.format(access=ACCESS_FILTER, keyset=SQLITE_KEYSET if cursor else "")
+    else:
+        return _search_like(db, user_id, query, limit, cursor)
+    statement = text(sql).columns(created_at=DateTime, updated_at=DateTime, rank=Float)
+    rows = db.execute(statement, params).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["rank"], rows[-1]["id"])
+    results = []
+    for row in rows:
+        result = dict(row)
+        # Expose a higher-is-better relevance score regardless of backend.
+        result["rank"] = row["rank"] if dialect == "postgresql" else -row["rank"]
+        results.append(result)
+    return results, next_cursor
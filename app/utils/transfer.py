@@ -0,0 +1,209 @@
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.activity_log import ActivityLog
+from app.models.note import Note
+from app.models.version import Version
+from app.utils import activity_retention, versioning
+
+# NDJSON backup format, one object per line, grouped by note:
+#   {"type": "note", "id", "title", "content", "created_at", "updated_at", "version_count"}
+#   {"type": "version", "note_id", "version_number", "content", "editor_id", "timestamp"}  (ascending)
+#   {"type": "log", "note_id", "user_id", "action", "timestamp"}
+# Versions are written with their full content so the file does not depend on keyframe layout.
+
+CHUNK_SIZE = 500  # rows per server-side cursor batch and per import INSERT
+FLUSH_BYTES = 64 * 1024
+
+class _Cursor:
+    """Walks a stream of rows ordered by note_id alongside the notes stream."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._next = next(self._rows, None)
+
+    def take(self, note_id: int) -> Iterator:
+        while self._next is not None and self._next.note_id < note_id:
+            self._next = next(self._rows, None)
+        while self._next is not None and self._next.note_id == note_id:
+            yield self._next
+            self._next = next(self._rows, None)
+
+def _stream(db: Session, statement):
+    return db.execute(statement.execution_options(yield_per=CHUNK_SIZE))
+
+def _line(record: dict) -> bytes:
+    return (json.dumps(record, default=str, separators=(",", ":")) + "\n").encode()
+
+def export_lines(session_factory, user_id: int) -> Iterator[bytes]:
+    """NDJSON export of every note `user_id` owns, with memory bounded by CHUNK_SIZE.
+
+    Notes, versions and logs are read through three server-side cursors ordered by note id
+    and merged, so nothing is collected per user. Each cursor needs its own connection.
+    """
+    notes_db, versions_db, logs_db = session_factory(), session_factory(), session_factory()
+    try:
+        owned = select(Note.id).where(Note.owner_id == user_id)
+        notes = _stream(notes_db, select(Note.id, Note.title, Note.content, Note.created_at, Note.updated_at, Note.version_count)
+                        .where(Note.owner_id == user_id).order_by(Note.id))
+        versions = _Cursor(_stream(versions_db, select(Version.note_id, Version.version_number, Version.content_snapshot,
+                                                       Version.delta, Version.editor_id, Version.timestamp)
+                                   .where(Version.note_id.in_(owned)).order_by(Version.note_id, Version.version_number)))
+        logs = _Cursor(_stream(logs_db, select(ActivityLog.note_id, ActivityLog.user_id, ActivityLog.action, ActivityLog.timestamp)
+                               .where(ActivityLog.note_id.in_(owned)).order_by(ActivityLog.note_id, ActivityLog.id)))
+        for note in notes:
+            yield _line({"type": "note", **note._asdict()})
+            keyframe = None
+            for version in versions.take(note.id):
+                if version.content_snapshot is not None:
+                    content = keyframe = version.content_snapshot
+                elif keyframe is not None:
+                    content = versioning.apply_delta(keyframe, version.delta)
+                else:
+                    content = versioning.get_content(versions_db, version)
+                yield _line({"type": "version", "note_id": version.note_id, "version_number": version.version_number,
+                             "content": content, "editor_id": version.editor_id, "timestamp": version.timestamp})
+            for log in logs.take(note.id):
+                yield _line({"type": "log", **log._asdict()})
+    finally:
+        notes_db.close()
+        versions_db.close()
+        logs_db.close()
+
+def buffered(lines: Iterator[bytes], gzip: bool = False) -> Iterator[bytes]:
+    """Coalesce lines into ~64 KiB chunks, gzip-compressed on the fly if requested."""
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    buffer = bytearray()
+    for line in lines:
+        buffer += line
+        if len(buffer) >= FLUSH_BYTES:
+            yield compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+    if compressor:
+        yield compressor.compress(bytes(buffer)) + compressor.flush()
+    elif buffer:
+        yield bytes(buffer)
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict]]:
+    """Parse an NDJSON request body incrementally; gzip input is detected by its magic bytes.
+
+    Memory stays bounded by import_max_line_bytes, and the body by import_max_bytes after
+    decompression, so neither a line without newlines nor a gzip bomb is buffered whole.
+    """
+    max_line, max_bytes = settings.import_max_line_bytes, settings.import_max_bytes
+    decompressor = None
+    pending = b""
+    number = 0
+    total = 0
+    first = True
+    async for chunk in chunks:
+        if first and chunk:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(wbits=31)
+        if decompressor:
+            try:
+                # Inflate at most one byte past the limit; the rest of the input is never expanded
+                chunk = decompressor.decompress(chunk, max_bytes - total + 1)
+            except zlib.error:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid gzip data")
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(f"Import larger than {max_bytes} bytes")
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        if len(pending) > max_line or any(len(line) > max_line for line in lines):
+            raise _too_large(f"Import record longer than {max_line} bytes")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, _parse(number, line)
+    if pending.strip():
+        yield number + 1, _parse(number + 1, pending)
+
+def _parse(number: int, line: bytes) -> dict:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        record = None
+    if not isinstance(record, dict) or record.get("type") not in ("note", "version", "log"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid record on line {number}")
+    return record
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+class Importer:
+    """Bulk-inserts parsed export records one chunk at a time, in the caller's transaction.
+
+    Notes get new ids; `note_ids` maps exported ids to them (one int pair per note). Versions
+    are re-encoded as keyframes and deltas, which only needs the current note's latest keyframe
+    since exports list a note's versions in ascending order. Every version and log row is
+    credited to the importing user: ids in the file are not proof of who did what.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.note_ids: dict[int, int] = {}
+        self.version_counts: dict[int, int] = {}
+        self.counts = {"notes": 0, "versions": 0, "logs": 0}
+        self._keyframe = None  # (note_id, version_number, content)
+
+    def import_chunk(self, db: Session, records: list[dict]):
+        try:
+            self._import(db, records)
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed export record")
+
+    def _import(self, db: Session, records: list[dict]):
+        notes = [record for record in records if record["type"] == "note"]
+        if notes:
+            rows = [{"title": note["title"], "content": note["content"], "owner_id": self.user_id,
+                     "created_at": _timestamp(note.get("created_at")) or datetime.utcnow(),
+                     "updated_at": _timestamp(note.get("updated_at")) or datetime.utcnow(),
+                     "version_count": int(note.get("version_count") or 0)} for note in notes]
+            new_ids = db.scalars(insert(Note).returning(Note.id, sort_by_parameter_order=True), rows).all()
+            self.note_ids.update((int(note["id"]), new_id) for note, new_id in zip(notes, new_ids))
+            self.version_counts.update(zip(new_ids, (row["version_count"] for row in rows)))
+            self.counts["notes"] += len(notes)
+
+        others = [record for record in records if record["type"] != "note"]
+        versions, logs, counts = [], [], {}
+        for record in others:
+            note_id = self.note_ids.get(record["note_id"])
+            if note_id is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{record['type']} for unknown note {record['note_id']}")
+            if record["type"] == "version":
+                number, content = int(record["version_number"]), record["content"]
+                keyframe = self._keyframe[1:] if self._keyframe and self._keyframe[0] == note_id else None
+                snapshot, delta = versioning.encode_content(keyframe, number, content)
+                if snapshot is not None:
+                    self._keyframe = (note_id, number, content)
+                versions.append({"note_id": note_id, "version_number": number, "content_snapshot": snapshot, "delta": delta,
+                                 "editor_id": self.user_id, "timestamp": _timestamp(record.get("timestamp")) or datetime.utcnow()})
+                if number > self.version_counts[note_id]:
+                    self.version_counts[note_id] = counts[note_id] = number
+            else:
+                logs.append({"note_id": note_id, "user_id": self.user_id, "action": record["action"],
+                             "timestamp": _timestamp(record.get("timestamp")) or datetime.utcnow()})
+        if versions:
+            db.execute(insert(Version), versions)
+            if counts:
+                db.execute(update(Note), [{"id": note_id, "version_count": count} for note_id, count in counts.items()])
+            self.counts["versions"] += len(versions)
+        if logs:
+            db.execute(insert(ActivityLog), logs)
+            activity_retention.roll_up_late(db, logs)
+            self.counts["logs"] += len(logs)
+
+    def finish(self, db: Session) -> dict:
+        db.commit()
+        return self.counts
@@ -0,0 +1,190 @@
+import json
+import logging
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, advisory_lock
+from app.models.note import Note
+from app.models.version import Version
+from app.utils import versioning
+from app.utils.lazy import Lazy
+
+logger = logging.getLogger(__name__)
+
+# Version-history retention, run by VersionCompaction in every worker (PostgreSQL takes an
+# advisory lock so only one does the work) or once via
+# `python -m app.utils.version_retention [--dry-run]`. Beyond the newest version_keep_last
+# versions of a note, history is thinned to the newest version per hour for
+# version_hourly_days, per day up to version_daily_days and per week after that; versions
+# older than version_max_age_days are removed. Each note is compacted in its own short
+# transaction holding its row lock, so writers of that note wait for one note at most.
+#
+# Versions from the latest keyframe on are never removed: writers encode new deltas against
+# it. When an older keyframe is removed, the kept deltas that were based on it are decoded
+# and re-encoded, the first of them becoming the new keyframe.
+
+LOCK_KEY = 7201502  # pg advisory lock id for the compaction job
+
+def _utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def select_removals(history, now: datetime) -> list[int]:
+    """Version numbers the policy removes; `history` is (version_number, timestamp), newest first."""
+    buckets = set()
+    removals = []
+    for index, (number, timestamp) in enumerate(history):
+        if index < settings.version_keep_last:
+            continue
+        timestamp = _utc(timestamp)
+        age = now - timestamp
+        if settings.version_max_age_days > 0 and age > timedelta(days=settings.version_max_age_days):
+            removals.append(number)
+            continue
+        if age <= timedelta(days=settings.version_hourly_days):
+            bucket = ("hour", timestamp.date(), timestamp.hour)
+        elif age <= timedelta(days=settings.version_daily_days):
+            bucket = ("day", timestamp.date())
+        else:
+            bucket = ("week", *timestamp.isocalendar()[:2])
+        if bucket in buckets:
+            removals.append(number)  # a newer version already represents this period
+        else:
+            buckets.add(bucket)
+    return removals
+
+def _orphaned(keyframes: list[int], numbers: list[int], removed: set[int]) -> list[tuple[int, int, list[int]]]:
+    """(keyframe, next keyframe or None, kept deltas based on it) for every removed keyframe."""
+    groups = []
+    for index, keyframe in enumerate(keyframes):
+        if keyframe not in removed:
+            continue
+        end = keyframes[index + 1] if index + 1 < len(keyframes) else None
+        kept = [n for n in numbers if n > keyframe and (end is None or n < end) and n not in removed]
+        if kept:
+            groups.append((keyframe, end, kept))
+    return groups
+
+def _reencode(db: Session, note_id: int, keyframe: int, end: Optional[int], kept: set[int]):
+    query = db.query(Version).filter(Version.note_id == note_id, Version.version_number >= keyframe)
+    if end is not None:
+        query = query.filter(Version.version_number < end)
+    rows = query.order_by(Version.version_number).all()
+    contents = dict(zip((row.version_number for row in rows), versioning.get_contents(db, rows)))
+    base = None
+    for row in rows:
+        if row.version_number not in kept:
+            continue
+        row.content_snapshot, row.delta = versioning.encode_content(base, row.version_number, contents[row.version_number])
+        if row.content_snapshot is not None:
+            base = (row.version_number, row.content_snapshot)
+
+def compact_note(db: Session, note_id: int, now: datetime, dry_run: bool = False) -> dict:
+    # Writers claim version numbers with an UPDATE of the note row; holding its lock keeps
+    # them from encoding against a keyframe while it is being replaced
+    db.execute(select(Note.id).where(Note.id == note_id).with_for_update())
+    history = db.execute(
+        select(Version.version_number, Version.timestamp, Version.content_snapshot.isnot(None))
+        .where(Version.note_id == note_id).order_by(Version.version_number.desc())
+    ).all()
+    keyframes = sorted(number for number, _, is_keyframe in history if is_keyframe)
+    protected = keyframes[-1] if keyframes else 0
+    removals = [number for number in select_removals([(number, timestamp) for number, timestamp, _ in history], now) if number < protected]
+    groups = _orphaned(keyframes, sorted(number for number, _, _ in history), set(removals))
+    result = {"removed": len(removals), "reencoded": sum(len(kept) for _, _, kept in groups)}
+    if dry_run or not removals:
+        return result
+    for keyframe, end, kept in groups:
+        _reencode(db, note_id, keyframe, end, set(kept))
+    db.execute(delete(Version).where(Version.note_id == note_id, Version.version_number.in_(removals)),
+               execution_options={"synchronize_session": False})
+    db.execute(update(Note).where(Note.id == note_id).values(history_pruned=Note.history_pruned + len(removals), updated_at=Note.updated_at))  # not an edit
+    return result
+
+def run_compaction(session_factory=SessionLocal, now: Optional[datetime] = None, dry_run: bool = False) -> dict:
+    if settings.version_keep_last <= 0:
+        return {"disabled": True}
+    now = now or datetime.utcnow()
+    totals = {"notes": 0, "removed": 0, "reencoded": 0, "dry_run": dry_run}
+    db = session_factory()
+    try:
+        with advisory_lock(db.get_bind(), LOCK_KEY) as locked:
+            if not locked:
+                return {"skipped": True}
+            after = 0
+            while True:
+                # Only notes with more versions than are always kept can lose any
+                note_ids = db.scalars(
+                    select(Version.note_id).where(Version.note_id > after).group_by(Version.note_id)
+                    .having(func.count() > settings.version_keep_last).order_by(Version.note_id).limit(settings.version_compaction_batch)
+                ).all()
+                db.rollback()
+                for note_id in note_ids:
+                    result = compact_note(db, note_id, now, dry_run)
+                    if dry_run:
+                        db.rollback()
+                    else:
+                        db.commit()
+                        if result["removed"]:
+                            versioning.forget_note(note_id)
+                    totals["notes"] += bool(result["removed"])
+                    totals["removed"] += result["removed"]
+                    totals["reencoded"] += result["reencoded"]
+                if len(note_ids) < settings.version_compaction_batch:
+                    return totals
+                after = note_ids[-1]
+    finally:
+        db.close()
+
+class VersionCompaction:
+    """Runs run_compaction every `interval` seconds on a background thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+        self._counters = {"runs": 0, "failed_runs": 0, "notes": 0, "removed": 0, "reencoded": 0}
+        self.last_run = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0 or settings.version_keep_last <= 0:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="version-compaction", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def run_once(self) -> dict:
+        try:
+            result = run_compaction()
+        except Exception:
+            self._counters["failed_runs"] += 1
+            logger.exception("Version compaction failed")
+            return {}
+        self._counters["runs"] += 1
+        for key in ("notes", "removed", "reencoded"):
+            self._counters[key] += result.get(key, 0)
+        self.last_run = datetime.utcnow()
+        return result
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self.run_once()
+
+    def stats(self) -> dict:
+        return {**self._counters, "last_run": self.last_run}
+
+version_compaction = Lazy(lambda: VersionCompaction(settings.version_compaction_interval))
+
+if __name__ == "__main__":
+    from app.models import activity_log, user  # noqa: F401  (mappers for the relationships)
+    print(json.dumps(run_compaction(dry_run="--dry-run" in sys.argv)))
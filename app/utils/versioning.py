@@ -0,0 +1,182 @@
+import functools
+import json
+import zlib
+from difflib import SequenceMatcher
+from sqlalchemy import and_, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.note import Note
+from app.models.version import Version
+from app.utils import diff
+from app.utils.cache import LRUCache
+from app.utils.lazy import Lazy
+from app.utils.read_cache import read_cache
+
+# Version storage: every `version_keyframe_interval` versions (and whenever a delta would not
+# be smaller) the full text is kept in `content_snapshot`; the versions in between store a
+# zlib-compressed line delta against that keyframe in `delta`, so any version is rebuilt from
+# at most one keyframe and one delta.
+
+_cache = Lazy(lambda: LRUCache(settings.version_cache_size))
+
+CLAIMED = "versioning.claimed_notes"  # Session.info key: notes whose counter this transaction bumped
+
+def make_delta(base: str, target: str) -> bytes:
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, base_lines, target_lines).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])  # copy base lines [i1, i2)
+        elif j2 > j1:
+            ops.append("".join(target_lines[j1:j2]))  # literal text
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode())
+
+def apply_delta(base: str, delta: bytes) -> str:
+    base_lines = base.splitlines(keepends=True)
+    return "".join(
+        "".join(base_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in json.loads(zlib.decompress(delta))
+    )
+
+def _keyframe_before(db: Session, note_id: int, version_number: int):
+    number = db.query(Version.version_number).filter(
+        Version.note_id == note_id,
+        Version.version_number < version_number,
+        Version.content_snapshot.isnot(None),
+    ).order_by(Version.version_number.desc()).limit(1).scalar()
+    if number is None:
+        return None
+    content = _cache.get((note_id, number))
+    if content is None:
+        content = db.query(Version.content_snapshot).filter(Version.note_id == note_id, Version.version_number == number).scalar()
+        _cache.set((note_id, number), content)
+    return number, content
+
+def encode_content(keyframe, version_number: int, content: str):
+    """(content_snapshot, delta) for a version given the latest earlier keyframe (number, content)."""
+    delta = None
+    if keyframe and version_number - keyframe[0] < settings.version_keyframe_interval:
+        delta = make_delta(keyframe[1], content)
+        if len(delta) >= len(content.encode()):
+            delta = None
+    return (content if delta is None else None), delta
+
+def encode_version(db: Session, version: Version, content: str) -> Version:
+    keyframe = _keyframe_before(db, version.note_id, version.version_number)
+    version.content_snapshot, version.delta = encode_content(keyframe, version.version_number, content)
+    return version
+
+def add_version(db: Session, note_id: int, version_number: int, content: str, editor_id: int) -> Version:
+    version = encode_version(db, Version(note_id=note_id, version_number=version_number, editor_id=editor_id), content)
+    db.add(version)
+    return version
+
+def next_version_number(db: Session, note_id: int) -> int:
+    """Claim the next version number from the note's counter.
+
+    The UPDATE holds the note's row lock until commit, so concurrent edits of one note are
+    serialized and never draw the same number; the cost does not grow with history length.
+    updated_at is set to itself so its onupdate does not fire: claiming a number is not an
+    edit, and callers compare updated_at to detect edits that landed in between.
+    """
+    db.info.setdefault(CLAIMED, set()).add(note_id)
+    return db.execute(
+        update(Note).where(Note.id == note_id).values(version_count=Note.version_count + 1, updated_at=Note.updated_at)
+        .returning(Note.version_count)
+    ).scalar_one()
+
+def next_version_numbers(db: Session, note_ids: list[int]) -> dict[int, int]:
+    db.info.setdefault(CLAIMED, set()).update(note_ids)
+    return dict(db.execute(
+        update(Note).where(Note.id.in_(note_ids)).values(version_count=Note.version_count + 1, updated_at=Note.updated_at)
+        .returning(Note.id, Note.version_count)
+    ).all())
+
+def resync_version_counts(db: Session, note_ids):
+    latest = select(func.coalesce(func.max(Version.version_number), 0)).where(Version.note_id == Note.id).scalar_subquery()
+    db.execute(update(Note).where(Note.id.in_(note_ids)).values(version_count=latest, updated_at=Note.updated_at), execution_options={"synchronize_session": False})
+
+def retry_on_version_conflict(fn):
+    """Re-run a `fn(db, ...)` handler when its version insert hits uq_versions_note_version.
+
+    With every writer going through the counter this only happens when the counter lags the
+    table (rows written by an older release or by hand); it is caught up before retrying.
+    """
+    @functools.wraps(fn)
+    def wrapper(db: Session, *args, **kwargs):
+        for attempt in range(settings.version_conflict_retries + 1):
+            db.info.pop(CLAIMED, None)
+            try:
+                return fn(db, *args, **kwargs)
+            except IntegrityError:
+                claimed = db.info.pop(CLAIMED, None)
+                db.rollback()
+                if not claimed or attempt == settings.version_conflict_retries:
+                    raise
+                resync_version_counts(db, claimed)
+                db.commit()
+    return wrapper
+
+def add_versions(db: Session, contents: dict[int, str], editor_id: int) -> dict[int, int]:
+    """Bulk add_version for many notes at once; returns note_id -> new version number.
+
+    Version numbers are claimed with one UPDATE ... RETURNING, the latest keyframe of every
+    note comes from one grouped query and the rows are written with a single executemany INSERT.
+    """
+    if not contents:
+        return {}
+    note_ids = list(contents)
+    numbers = next_version_numbers(db, note_ids)
+    newest_keyframe = select(Version.note_id, func.max(Version.version_number).label("version_number")).where(
+        Version.note_id.in_(note_ids), Version.content_snapshot.isnot(None)
+    ).group_by(Version.note_id).subquery()
+    keyframes = {
+        note_id: (number, snapshot)
+        for note_id, number, snapshot in db.query(Version.note_id, Version.version_number, Version.content_snapshot).join(
+            newest_keyframe,
+            and_(Version.note_id == newest_keyframe.c.note_id, Version.version_number == newest_keyframe.c.version_number),
+        )
+    }
+    rows = []
+    for note_id, content in contents.items():
+        number = numbers[note_id]
+        snapshot, delta = encode_content(keyframes.get(note_id), number, content)
+        rows.append({"note_id": note_id, "version_number": number, "content_snapshot": snapshot, "delta": delta, "editor_id": editor_id})
+    db.execute(insert(Version), rows)
+    return numbers
+
+def get_content(db: Session, version: Version) -> str:
+    if version.content_snapshot is not None:
+        return version.content_snapshot
+    key = (version.note_id, version.version_number)
+    content = _cache.get(key)
+    if content is None:
+        _, base = _keyframe_before(db, version.note_id, version.version_number)
+        content = apply_delta(base, version.delta)
+        _cache.set(key, content)
+    return content
+
+def get_contents(db: Session, versions: list[Version]) -> list[str]:
+    # `versions` must be a contiguous, ascending run of one note's history, so every delta's
+    # keyframe is either earlier in the run or fetched once for the leading deltas.
+    contents = []
+    keyframe = None
+    for version in versions:
+        if version.content_snapshot is not None:
+            keyframe = version.content_snapshot
+            contents.append(keyframe)
+        elif keyframe is not None:
+            contents.append(apply_delta(keyframe, version.delta))
+        else:
+            contents.append(get_content(db, version))
+    return contents
+
+def forget_note(note_id: int):
+    _cache.discard_where(lambda key: key[0] == note_id)
+    diff.forget_note(note_id)
+    read_cache.forget_note(note_id)
+
+def stats() -> dict:
+    return _cache.stats()
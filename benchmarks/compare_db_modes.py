@@ -0,0 +1,94 @@
+"""Compare request throughput of the sync (threadpool) and async database modes.
+
+    python -m benchmarks.compare_db_modes --requests 3000 --concurrency 200
+
+Each mode runs in its own subprocess (the mode is fixed at import time) against a fresh
+database: a temporary SQLite file by default, or --database-url for a scratch Postgres.
+Requests are driven in-process through httpx's ASGI transport, so the numbers measure the
+app and the database rather than the network stack.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+def run_mode(args):
+    import httpx
+    from app.database import Base, SessionLocal, engine
+    from app.main import app
+    from app.models.note import Note
+    from app.models.user import User
+    from app.auth.utils import hash_password
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", hashed_password=hash_password("bench"))
+    db.add(user)
+    db.flush()
+    db.add_all([Note(title=f"Note {i}", content="lorem ipsum " * 200, owner_id=user.id) for i in range(args.notes)])
+    db.commit()
+    db.close()
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            login = await client.post("/auth/login", json={"username": "bench", "password": "bench"})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            semaphore = asyncio.Semaphore(args.concurrency)
+            latencies = []
+
+            async def one(i):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(f"/notes/{i % args.notes + 1}", headers=headers)
+                    latencies.append(time.perf_counter() - started)
+                    response.raise_for_status()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(args.requests)))
+            elapsed = time.perf_counter() - started
+            latencies.sort()
+            return {
+                "rps": args.requests / elapsed,
+                "p50_ms": statistics.median(latencies) * 1000,
+                "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+            }
+
+    print(json.dumps(asyncio.run(main())))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--notes", type=int, default=100)
+    parser.add_argument("--database-url")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_mode(args)
+
+    results = {}
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ)
+            env.setdefault("SECRET_KEY", "benchmark")
+            env["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+            env["ASYNC_MODE"] = "true" if mode == "async" else "false"
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.compare_db_modes", "--child",
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency), "--notes", str(args.notes)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+    print(f"{'mode':<6} {'rps':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for mode, result in results.items():
+        print(f"{mode:<6} {result['rps']:>10.1f} {result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
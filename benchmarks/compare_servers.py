@@ -0,0 +1,144 @@
+"""Compare HTTP throughput of the development server and the production server profile.
+
+    python -m benchmarks.compare_servers --requests 4000 --concurrency 64
+    python -m benchmarks.compare_servers --database-url postgresql://localhost/notes_bench --workers 4
+
+Both servers run as subprocesses against the same seeded database (a temporary SQLite file by
+default, or --database-url for a scratch Postgres): `uvicorn app.main:app` with one worker, as
+docker-compose runs it, and `python -m app.server` with --workers (default: one per CPU).
+Load comes over real sockets from --clients processes, so unlike the in-process benchmarks
+the numbers include the HTTP stack and worker scheduling. Each endpoint reports RPS and
+p50/p99 latency: a full page of notes, where response serialization dominates, and a single note.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.startup import free_port
+
+PASSWORD = "bench-password"
+ENDPOINTS = (("list 100 notes", "/notes/?limit=100"), ("single note", "/notes/{id}"))
+
+def seed(notes: int):
+    from app.auth.utils import hash_password
+    from app.database import Base, SessionLocal, engine
+    from app.models import activity_log, version  # noqa: F401  (mappers for the relationships)
+    from app.models.note import Note
+    from app.models.user import User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", hashed_password=hash_password(PASSWORD))
+    db.add(user)
+    db.flush()
+    db.add_all([Note(title=f"Note {i}", content="lorem ipsum dolor sit amet\n" * 80, owner_id=user.id) for i in range(notes)])
+    db.commit()
+    db.close()
+    engine.dispose()
+
+def wait_ready(url: str, server: subprocess.Popen, timeout: float):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited during startup:\n{server.stderr.read().decode()}")
+        try:
+            with urllib.request.urlopen(f"{url}/", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"no response within {timeout}s")
+
+def drive(url: str, headers: dict, path: str, notes: int, requests: int, concurrency: int) -> list[float]:
+    import httpx
+
+    async def main():
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=60) as client:
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies = []
+
+            async def one(i):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(path.format(id=i % notes + 1))
+                    latencies.append(time.perf_counter() - started)
+                    response.raise_for_status()
+
+            await asyncio.gather(*(one(i) for i in range(requests)))
+            return latencies
+
+    return asyncio.run(main())
+
+def measure(url: str, args) -> dict:
+    import httpx
+    login = httpx.post(f"{url}/auth/login", json={"username": "bench", "password": PASSWORD})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    results = {}
+    with ProcessPoolExecutor(args.clients) as pool:
+        for name, path in ENDPOINTS:
+            drive(url, headers, path, args.notes, args.concurrency, args.concurrency)  # warm up connections and caches
+            share = args.requests // args.clients
+            started = time.perf_counter()
+            runs = [pool.submit(drive, url, headers, path, args.notes, share, max(1, args.concurrency // args.clients))
+                    for _ in range(args.clients)]
+            latencies = sorted(latency for run in runs for latency in run.result())
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                "rps": len(latencies) / elapsed,
+                "p50_ms": statistics.median(latencies) * 1000,
+                "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+            }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=0, help="app.server workers; 0 is one per CPU")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault("SECRET_KEY", "benchmark")
+        env["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+        env["REQUEST_METRICS"] = env.get("REQUEST_METRICS", "false")
+        os.environ.update(env)
+        seed(args.notes)
+
+        results = {}
+        for name in ("uvicorn", "app.server"):
+            port = free_port()
+            if name == "uvicorn":
+                command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+            else:
+                command = [sys.executable, "-m", "app.server"]
+                env.update(WEB_BIND=f"127.0.0.1:{port}", WEB_WORKERS=str(args.workers))
+            server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            try:
+                url = f"http://127.0.0.1:{port}"
+                wait_ready(url, server, args.timeout)
+                results[name] = measure(url, args)
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(f"{'server':<12} {'endpoint':<16} {'rps':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, endpoints in results.items():
+        for endpoint, result in endpoints.items():
+            print(f"{name:<12} {endpoint:<16} {result['rps']:>10.1f} {result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f}")
+    for endpoint in results["uvicorn"]:
+        print(f"app.server / uvicorn, {endpoint}: {results['app.server'][endpoint]['rps'] / results['uvicorn'][endpoint]['rps']:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""Load-test the Notes API on a seeded dataset and compare the results with a saved baseline.
+
+    python -m benchmarks.load --requests 5000 --concurrency 50
+    python -m benchmarks.load --database-url postgresql://localhost/notes_bench --save-baseline benchmarks/baseline.json
+    python -m benchmarks.load --database-url postgresql://localhost/notes_bench --baseline benchmarks/baseline.json
+
+The database is treated as scratch: its tables are dropped and seeded again unless --reuse is
+given. The seed is deterministic: users, notes of varied sizes (mostly small, some ~100 KB),
+a few notes with deep version histories and notes shared with collaborators. Requests are
+driven in-process through httpx's ASGI transport with the app's lifespan running, so the
+numbers measure the app and the database rather than the network stack.
+
+Every endpoint reports RPS, p50/p95/p99 latency and SQL statements per request. With
+--baseline, endpoints slower (or issuing more queries) than the baseline by more than
+--tolerance are flagged and the exit status is 1, so the run can gate CI.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PASSWORD = "bench-password"
+WORDS = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november oscar papa "
+         "quebec romeo sierra tango uniform victor whiskey xray yankee zulu meeting budget roadmap release "
+         "design review customer invoice travel recipe garden project backlog incident migration").split()
+NOTE_SIZES = ((0.70, 60), (0.25, 800), (0.05, 15000))  # (share of notes, words)
+
+_queries = contextvars.ContextVar("queries", default=None)
+
+def _words(rng: random.Random, count: int) -> str:
+    lines = []
+    while count > 0:
+        length = min(count, rng.randint(6, 14))
+        lines.append(" ".join(rng.choices(WORDS, k=length)))
+        count -= length
+    return "\n".join(lines)
+
+def _note_size(rng: random.Random) -> int:
+    pick = rng.random()
+    for share, words in NOTE_SIZES:
+        if pick < share:
+            return max(5, int(rng.gauss(words, words / 4)))
+        pick -= share
+    return NOTE_SIZES[-1][1]
+
+def _edit(rng: random.Random, content: str) -> str:
+    lines = content.split("\n")
+    index = rng.randrange(len(lines))
+    if rng.random() < 0.5:
+        lines[index] = _words(rng, 8)
+    else:
+        lines.insert(index, _words(rng, 8))
+    return "\n".join(lines)
+
+def seed(args):
+    """Create the schema and the dataset; returns the number of rows written per table."""
+    from sqlalchemy import bindparam, insert, text, update
+    from app.auth.utils import hash_password
+    from app.database import Base, get_engine
+    from app.models.activity_log import ActivityLog
+    from app.models.note import Note, note_collaborators
+    from app.models.user import User
+    from app.models.version import Version
+    from app.utils import versioning
+
+    rng = random.Random(args.seed)
+    engine = get_engine()
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    hashed = hash_password(PASSWORD)
+    started = datetime.utcnow() - timedelta(days=365)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": i, "username": f"user{i}", "email": f"user{i}@bench.example", "hashed_password": hashed}
+                                    for i in range(1, args.users + 1)])
+        notes = []
+        for i in range(1, args.notes + 1):
+            timestamp = started + timedelta(minutes=rng.randrange(365 * 24 * 60))
+            notes.append({"id": i, "title": _words(rng, rng.randint(2, 6)).replace("\n", " "), "content": _words(rng, _note_size(rng)),
+                          "owner_id": rng.randint(1, args.users), "created_at": timestamp, "updated_at": timestamp})
+        for start in range(0, len(notes), 1000):
+            conn.execute(insert(Note), notes[start:start + 1000])
+
+        shared = [{"note_id": note["id"], "user_id": user_id}
+                  for note in notes if rng.random() < args.shared
+                  for user_id in rng.sample([u for u in range(1, args.users + 1) if u != note["owner_id"]], k=min(rng.randint(1, 3), args.users - 1))]
+        if shared:
+            conn.execute(insert(note_collaborators), shared)
+
+        deep = set(rng.sample([note["id"] for note in notes], k=min(args.deep_notes, len(notes))))
+        versions, counts, logs = [], [], []
+        for note in notes:
+            depth = args.history if note["id"] in deep else rng.choice((0, 0, 1, 2, 5))
+            content, keyframe = note["content"], None
+            for number in range(1, depth + 1):
+                snapshot, delta = versioning.encode_content(keyframe, number, content)
+                if snapshot is not None:
+                    keyframe = (number, content)
+                versions.append({"note_id": note["id"], "version_number": number, "content_snapshot": snapshot, "delta": delta,
+                                 "editor_id": note["owner_id"], "timestamp": note["created_at"] + timedelta(minutes=number)})
+                logs.append({"note_id": note["id"], "user_id": note["owner_id"], "action": "edit", "timestamp": versions[-1]["timestamp"]})
+                content = _edit(rng, content)
+            if depth:
+                counts.append({"note": note["id"], "latest": content, "count": depth})
+            if len(versions) >= 1000:
+                conn.execute(insert(Version), versions)
+                versions = []
+        if versions:
+            conn.execute(insert(Version), versions)
+        if counts:
+            conn.execute(update(Note).where(Note.id == bindparam("note")).values(content=bindparam("latest"), version_count=bindparam("count")), counts)
+        for start in range(0, len(logs), 1000):
+            conn.execute(insert(ActivityLog), logs[start:start + 1000])
+        if conn.dialect.name == "postgresql":
+            # Users and notes were inserted with explicit ids; move their sequences past them.
+            for table in ("users", "notes"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+    return {"users": args.users, "notes": len(notes), "collaborators": len(shared), "versions": sum(c["count"] for c in counts)}
+
+def load_dataset():
+    """Which notes each user can reach, and how many versions they have, from the database."""
+    from sqlalchemy import select
+    from app.database import SessionLocal
+    from app.models.note import Note, note_collaborators
+    from app.models.user import User
+
+    with SessionLocal() as db:
+        users = db.execute(select(User.id, User.username)).all()
+        notes = {note_id: [owner_id, count] for note_id, owner_id, count in db.execute(select(Note.id, Note.owner_id, Note.version_count))}
+        shared = db.execute(select(note_collaborators.c.note_id, note_collaborators.c.user_id)).all()
+    accessible = {user_id: [] for user_id, _ in users}
+    for note_id, (owner_id, _) in notes.items():
+        accessible[owner_id].append(note_id)
+    for note_id, user_id in shared:
+        accessible[user_id].append(note_id)
+    return {"users": dict(users), "notes": notes, "accessible": {user_id: ids for user_id, ids in accessible.items() if ids}}
+
+# Scenarios: name -> (default weight, function returning (user id, method, url, request kwargs)).
+
+def _note(ctx, rng):
+    user_id = rng.choice(ctx["actors"])
+    return user_id, rng.choice(ctx["dataset"]["accessible"][user_id])
+
+def _versioned_note(ctx, rng):
+    for _ in range(20):
+        user_id, note_id = _note(ctx, rng)
+        if ctx["dataset"]["notes"][note_id][1]:
+            return user_id, note_id, ctx["dataset"]["notes"][note_id][1]
+    return user_id, note_id, 0
+
+def list_notes(ctx, rng):
+    return rng.choice(ctx["actors"]), "GET", "/notes/", {"params": {"limit": 20}}
+
+def get_note(ctx, rng):
+    user_id, note_id = _note(ctx, rng)
+    return user_id, "GET", f"/notes/{note_id}", {}
+
+def update_note(ctx, rng):
+    user_id, note_id = _note(ctx, rng)
+    return user_id, "PUT", f"/notes/{note_id}", {"json": {"title": "edited", "content": _words(rng, rng.choice((40, 400)))}}
+
+def create_note(ctx, rng):
+    return rng.choice(ctx["actors"]), "POST", "/notes/", {"json": {"title": _words(rng, 3), "content": _words(rng, 60)}}
+
+def search_notes(ctx, rng):
+    return rng.choice(ctx["actors"]), "GET", "/notes/search", {"params": {"query": " ".join(rng.sample(WORDS, 2)), "limit": 20}}
+
+def note_logs(ctx, rng):
+    user_id, note_id = _note(ctx, rng)
+    return user_id, "GET", f"/notes/{note_id}/logs", {"params": {"limit": 50}}
+
+def list_versions(ctx, rng):
+    user_id, note_id, _ = _versioned_note(ctx, rng)
+    return user_id, "GET", f"/versions/{note_id}", {}
+
+def get_version(ctx, rng):
+    user_id, note_id, count = _versioned_note(ctx, rng)
+    return user_id, "GET", f"/versions/{note_id}/{rng.randint(1, max(count, 1))}", {}
+
+def diff_versions(ctx, rng):
+    user_id, note_id, count = _versioned_note(ctx, rng)
+    first = rng.randint(1, max(count, 1))
+    return user_id, "GET", f"/versions/{note_id}/diff", {"params": {"from": first, "to": min(first + rng.randint(1, 10), max(count, 1))}}
+
+def login(ctx, rng):
+    user_id = rng.choice(ctx["actors"])
+    return None, "POST", "/auth/login", {"json": {"username": ctx["dataset"]["users"][user_id], "password": PASSWORD}}
+
+SCENARIOS = {
+    "list_notes": (20, list_notes),
+    "get_note": (25, get_note),
+    "update_note": (8, update_note),
+    "create_note": (4, create_note),
+    "search": (10, search_notes),
+    "note_logs": (5, note_logs),
+    "list_versions": (6, list_versions),
+    "get_version": (10, get_version),
+    "diff": (5, diff_versions),
+    "login": (2, login),
+}
+
+def percentile(samples: list[float], q: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+def summarize(samples: list[tuple[float, int, bool]], elapsed: float) -> dict:
+    latencies = sorted(sample[0] for sample in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if not sample[2]),
+        "rps": len(samples) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "queries_per_request": statistics.fmean(sample[1] for sample in samples) if samples else 0.0,
+    }
+
+def count_queries(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter = _queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+async def drive(args, mix: dict) -> dict:
+    import httpx
+    from app.config import settings
+    from app.database import get_async_engine, get_engine
+    from app.main import app
+
+    count_queries(get_engine())
+    if settings.async_mode:
+        count_queries(get_async_engine().sync_engine)
+    ctx = {"dataset": load_dataset()}
+    rng = random.Random(args.seed + 1)
+    ctx["actors"] = rng.sample(sorted(ctx["dataset"]["accessible"]), k=min(args.actors, len(ctx["dataset"]["accessible"])))
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            ctx["headers"] = {}
+            for user_id in ctx["actors"]:
+                response = await client.post("/auth/login", json={"username": ctx["dataset"]["users"][user_id], "password": PASSWORD})
+                response.raise_for_status()
+                ctx["headers"][user_id] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one(record: bool):
+                name = rng.choices(names, weights)[0]
+                user_id, method, url, kwargs = SCENARIOS[name][1](ctx, rng)
+                async with semaphore:
+                    counter = [0]
+                    _queries.set(counter)
+                    started = time.perf_counter()
+                    response = await client.request(method, url, headers=ctx["headers"].get(user_id), **kwargs)
+                    latency = time.perf_counter() - started
+                if record:
+                    samples[name].append((latency, counter[0], response.status_code < 400))
+
+            await asyncio.gather(*(one(False) for _ in range(args.warmup)))
+            started = time.perf_counter()
+            await asyncio.gather(*(one(True) for _ in range(args.requests)))
+            elapsed = time.perf_counter() - started
+
+    results = {name: summarize(values, elapsed) for name, values in samples.items() if values}
+    results["total"] = summarize([sample for values in samples.values() for sample in values], elapsed)
+    return results
+
+METRICS = (("rps", -1), ("p50_ms", 1), ("p95_ms", 1), ("p99_ms", 1), ("queries_per_request", 1))  # 1: higher is worse
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, direction in METRICS:
+            old, new = before[metric], result[metric]
+            if old and direction * (new - old) / old > tolerance:
+                regressions.append(f"{name} {metric}: {old:.1f} -> {new:.1f} ({(new - old) / old:+.0%})")
+    return regressions
+
+def print_table(results: dict, baseline: dict = None):
+    print(f"{'endpoint':<14} {'requests':>8} {'errors':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    for name, result in results.items():
+        line = (f"{name:<14} {result['requests']:>8} {result['errors']:>6} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} "
+                f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['queries_per_request']:>8.1f}")
+        if baseline and name in baseline and baseline[name]["p95_ms"]:
+            line += f"   p95 {(result['p95_ms'] - baseline[name]['p95_ms']) / baseline[name]['p95_ms']:+.0%} vs baseline"
+        print(line)
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--async", dest="async_mode", action="store_true", help="serve from the async engine (ASYNC_MODE=true)")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", type=parse_mix, default={name: weight for name, (weight, _) in SCENARIOS.items()},
+                        help="scenario weights, e.g. get_note=5,search=1 (default: the built-in mix)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--actors", type=int, default=50, help="users that send requests")
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--shared", type=float, default=0.2, help="share of notes with collaborators")
+    parser.add_argument("--deep-notes", type=int, default=20)
+    parser.add_argument("--history", type=int, default=300, help="versions per deep note")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reuse", action="store_true", help="keep the data already in the database")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read on first use, so the environment must be in place before app imports.
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+        os.environ["ASYNC_MODE"] = "true" if args.async_mode else "false"
+        os.environ["ACTIVITY_LOG_MAINTENANCE_INTERVAL"] = "0"
+
+        if not args.reuse:
+            started = time.perf_counter()
+            counts = seed(args)
+            print(f"seeded {counts} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        results = asyncio.run(drive(args, args.mix))
+
+        from sqlalchemy.engine import make_url
+        report = {
+            "config": {"backend": make_url(os.environ["DATABASE_URL"]).get_backend_name(), "async_mode": args.async_mode,
+                       "requests": args.requests, "concurrency": args.concurrency, "notes": args.notes, "users": args.users,
+                       "history": args.history, "python": platform.python_version()},
+            "created_at": datetime.utcnow().isoformat(),
+            "results": results,
+        }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            saved = json.load(file)
+        if saved["config"] != report["config"]:
+            print(f"warning: baseline config differs: {saved['config']}", file=sys.stderr)
+        baseline = saved["results"]
+    print_table(results, baseline)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measure cold start: process launch to the first successful HTTP response.
+
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --database-url postgresql://... --runs 5
+
+Each run starts a fresh `uvicorn app.main:app` process and polls GET / until it answers,
+so the number covers interpreter start, imports, the lifespan hook and the first request:
+what an autoscaled worker pays before it can take traffic. The import time of app.main is
+reported separately, from `python -X importtime`.
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def boot_to_first_response(env: dict, timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited during startup:\n{server.stderr.read().decode()}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def import_time(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            env=env, check=True, capture_output=True, text=True).stderr
+    return int(re.search(r"\|\s*(\d+) \| app\.main$", output, re.M).group(1)) / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault("SECRET_KEY", "benchmark")
+        env["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/startup.db"
+        imports = [import_time(env) for _ in range(args.runs)]
+        boots = [boot_to_first_response(env, args.timeout) for _ in range(args.runs)]
+    print(f"{'':<24} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for name, samples in (("import app.main", imports), ("boot to first response", boots)):
+        print(f"{name:<24} {statistics.median(samples) * 1000:>10.1f} {min(samples) * 1000:>10.1f} {max(samples) * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
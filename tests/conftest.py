@@ -3,41 +3,61 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.database import Base
+
+# The app and the fixtures share one scratch database; never the one DATABASE_URL points at.
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from app.database import Base, SessionLocal, get_engine
 from app.main import app
 from fastapi.testclient import TestClient
 
 @pytest.fixture(scope="session")
 def engine():
-    return create_engine("sqlite:///./test.db")
+    return get_engine()
 
 @pytest.fixture(scope="session")
 def tables(engine):
+    Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture(autouse=True)
+def _reset_state(tables):
+    # Every test starts without rows or anything the per-process caches kept from earlier ones
+    yield
+    from app.dependencies.auth import principal_cache
+    from app.utils import diff, versioning
+    from app.utils.access import acl_cache
+    from app.utils.activity import activity_writer
+    from app.utils.read_cache import read_cache
+    activity_writer.flush()
+    with get_engine().begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    for cache in (principal_cache, acl_cache, versioning._cache, diff._cache):
+        cache.clear()
+    read_cache.backend.delete_prefix("")
+
 @pytest.fixture
 def db_session(engine, tables):
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = sessionmaker(bind=connection)()
+    session = SessionLocal()
     yield session
     session.close()
-    transaction.rollback()
-    connection.close()
 
 @pytest.fixture
 def client():
-    return TestClient(app)
+    # One event loop for the whole test: async engines' connections belong to the loop that opened them
+    with TestClient(app) as client:
+        yield client
 
 @pytest.fixture
 def test_user(db_session):
     from app.models.user import User
     from app.auth.utils import hash_password
-    user = User(username="testuser", hashed_password=hash_password("testpass"))
+    user = User(username="testuser", email="testuser@example.com", hashed_password=hash_password("testpass"))
     db_session.add(user)
     db_session.commit()
     db_session.refresh(user)
@@ -50,4 +70,10 @@ def test_note(db_session, test_user):
     db_session.add(note)
     db_session.commit()
     db_session.refresh(note)
-    return note
\ No newline at end of file
+    return note
+
+@pytest.fixture
+def capture_queries():
+    # `with capture_queries() as queries: ...` then assert on queries.count to pin query budgets
+    from app.utils.instrumentation import capture_queries
+    return capture_queries
@@ -0,0 +1,41 @@
+import pytest
+from app.auth.jwt import decode_token
+from app.dependencies.auth import principal_cache
+
+def test_login_token_embeds_user_id(client, db_session, test_user, monkeypatch):
+    from app.config import settings
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    assert login.status_code == 200
+    assert "uid" not in decode_token(login.json()["access_token"])
+    monkeypatch.setattr(settings, "token_embed_user_id", True)
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    assert decode_token(login.json()["access_token"])["uid"] == test_user.id
+
+def test_rehash_drops_cached_principal(db_session, test_user):
+    from app.routers.auth import _rehash
+    principal_cache.set("testuser", {"id": test_user.id, "username": "testuser"})
+    _rehash(db_session, test_user.id, "new-hash")
+    assert principal_cache.get("testuser") is None
+
+def test_principal_cache_hit_on_repeat_requests(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    principal_cache.clear()
+    client.get(f"/notes/{test_note.id}", headers=headers)
+    hits = principal_cache.hits
+    client.get(f"/notes/{test_note.id}", headers=headers)
+    assert principal_cache.hits == hits + 1
+
+def test_password_hasher_rejects_when_saturated():
+    import asyncio
+    from app.auth.utils import PasswordHasher, PasswordHasherBusy, hash_password
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    hasher._slots.acquire()
+    with pytest.raises(PasswordHasherBusy):
+        asyncio.run(hasher.run(hash_password, "secret"))
+    assert hasher.stats()["rejected"] == 1
+
+def test_missing_token_is_401_with_challenge(client):
+    response = client.get("/notes/")
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
@@ -0,0 +1,24 @@
+import asyncio
+from app.utils.events import EventHub, LocalBroker
+
+def test_event_hub_drops_slow_consumer():
+    async def scenario():
+        hub = EventHub(LocalBroker(), max_queue=2)
+        hub.start(asyncio.get_running_loop())
+        fast, slow, other = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+        received = []
+        async def consume():
+            async for chunk in hub.stream(fast):
+                received.append(chunk)
+        task = asyncio.create_task(consume())
+        for note_id in range(4):
+            hub.publish({"type": "note.updated", "note_id": note_id, "actor_id": 3, "audience": [1]})
+            await asyncio.sleep(0.01)
+        chunks = [chunk async for chunk in hub.stream(slow)]
+        task.cancel()
+        return hub, received, chunks, other
+    hub, received, chunks, other = asyncio.run(scenario())
+    assert sum("event: note.updated" in chunk for chunk in received) == 4
+    assert chunks[-1].startswith("event: resync")
+    assert other.queue.empty()
+    assert hub.stats()["dropped_consumers"] == 1
@@ -1,11 +1,13 @@
 import pytest
+from app.utils.activity import activity_writer
 
 def test_get_note_logs_success(client, db_session, test_user, test_note):
     login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
     token = login.json()["access_token"]
     headers = {"Authorization": f"Bearer {token}"}
-    # View note to create log
+    # View note to create log; views are visible once the batched writer flushes
     client.get(f"/notes/{test_note.id}", headers=headers)
+    activity_writer.flush()
     response = client.get(f"/notes/{test_note.id}/logs", headers=headers)
     assert response.status_code == 200
     assert len(response.json()) >= 1
@@ -13,8 +15,8 @@ def test_get_note_logs_success(client, db_session, test_user, test_note):
 
 def test_get_note_logs_unauthorized(client, db_session, test_user, test_note):
     # Register another user
-    client.post("/auth/register", json={"username": "other", "password": "pass"})
-    login = client.post("/auth/login", json={"username": "other", "password": "pass"})
+    client.post("/auth/register", json={"username": "other", "email": "other@example.com", "password": "pass"})
+    login = client.post("/auth/login", json={"username": "other", "email": "other@example.com", "password": "pass"})
     token = login.json()["access_token"]
     headers = {"Authorization": f"Bearer {token}"}
     response = client.get(f"/notes/{test_note.id}/logs", headers=headers)
@@ -56,10 +58,103 @@ def test_logs_order_by_timestamp_desc(client, db_session, test_user, test_note):
     # Create multiple logs
     client.get(f"/notes/{test_note.id}", headers=headers)
     client.put(f"/notes/{test_note.id}", json={"title": "Edited", "content": "Edited content"}, headers=headers)
+    activity_writer.flush()
     response = client.get(f"/notes/{test_note.id}/logs", headers=headers)
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) >= 2
     # Check descending order (most recent first)
     for i in range(len(logs) - 1):
-        assert logs[i]["timestamp"] >= logs[i + 1]["timestamp"]
\ No newline at end of file
+        assert logs[i]["timestamp"] >= logs[i + 1]["timestamp"]
+def test_activity_writer_drops_when_queue_full():
+    from app.utils.activity import ActivityLogWriter
+    writer = ActivityLogWriter(session_factory=None, max_queue=1, batch_size=10, flush_interval=1.0)
+    writer.record(1, 1, "view")
+    writer.record(1, 1, "view")
+    stats = writer.stats()
+    assert stats["queue_depth"] == 1
+    assert stats["dropped"] == 1
+
+def test_activity_writer_drops_only_failing_rows(db_session, test_user, test_note):
+    from app.database import SessionLocal
+    from app.models.activity_log import ActivityLog
+    from app.utils.activity import ActivityLogWriter
+    writer = ActivityLogWriter(SessionLocal, max_queue=10, batch_size=10, flush_interval=60)
+    writer.record(test_note.id, test_user.id, "view")
+    writer.record(test_note.id, test_user.id, None)  # violates NOT NULL
+    writer.record(test_note.id, test_user.id, "edit")
+    assert writer.flush() == 2
+    assert writer.stats()["failed_rows"] == 1
+    assert sorted(log.action for log in db_session.query(ActivityLog)) == ["edit", "view"]
+
+def test_rollups_survive_pruning(db_session, test_user, test_note):
+    from datetime import datetime, timedelta
+    from app.config import settings
+    from app.models.activity_log import ActivityLog
+    from app.utils import activity_retention
+    now = datetime.utcnow()
+    db_session.add_all([ActivityLog(note_id=test_note.id, user_id=test_user.id, action="view", timestamp=now - timedelta(days=days))
+                        for days in range(settings.activity_log_retention_days + 10)])
+    db_session.commit()
+    activity_retention.roll_up(db_session, now)
+    db_session.commit()
+    pruned = activity_retention.prune(db_session, now)
+    assert pruned["deleted"] == 9  # days 91..99; the cutoff is midnight 90 days ago
+    rows, cursor = [], None
+    while True:
+        page, cursor = activity_retention.summarize(db_session, test_note.id, 40, cursor)
+        rows += page
+        if cursor is None:
+            break
+    assert sum(row["count"] for row in rows) == settings.activity_log_retention_days + 10
+    assert [row["day"] for row in rows] == sorted((row["day"] for row in rows), reverse=True)
+
+def test_late_rows_are_counted_in_rolled_up_days(db_session, test_user, test_note):
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.utils import activity_retention
+    from app.utils.activity import ActivityLogWriter
+    now = datetime.utcnow()
+    writer = ActivityLogWriter(SessionLocal, max_queue=10, batch_size=10, flush_interval=60)
+    writer.record(test_note.id, test_user.id, "view")
+    writer.flush()
+    activity_retention.roll_up(db_session, now + timedelta(days=2))
+    db_session.commit()
+    # a flush that lagged behind the rollup, for the day that was just rolled up
+    writer.record(test_note.id, test_user.id, "edit")
+    writer.flush()
+    activity_retention.prune(db_session, now + timedelta(days=400))
+    rows, _ = activity_retention.summarize(db_session, test_note.id, 10, None)
+    assert sorted((row["action"], row["count"]) for row in rows) == [("edit", 1), ("view", 1)]
+
+def test_partition_created_after_rows_landed_in_default(engine, db_session, test_user, test_note):
+    from datetime import datetime
+    from sqlalchemy import text
+    from app.models.activity_log import ActivityLog
+    from app.utils import activity_retention
+    if engine.dialect.name != "postgresql":
+        pytest.skip("partitioning is PostgreSQL only")
+    db_session.rollback()  # the fixtures' reads would block the DDL
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE activity_logs"))
+        connection.execute(text(
+            "CREATE TABLE activity_logs (id serial, note_id integer NOT NULL REFERENCES notes (id), "
+            "user_id integer NOT NULL REFERENCES users (id), action varchar NOT NULL, "
+            "timestamp timestamp NOT NULL, PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)"))
+        connection.execute(text("CREATE TABLE activity_logs_default PARTITION OF activity_logs DEFAULT"))
+    try:
+        now = datetime.utcnow()
+        # maintenance has not run yet this month, so this row goes to the default partition
+        db_session.add(ActivityLog(note_id=test_note.id, user_id=test_user.id, action="view", timestamp=now))
+        db_session.commit()
+        assert activity_retention.ensure_partitions(db_session, now.date()) == 3
+        db_session.commit()
+        name = activity_retention.partition_name(activity_retention.month_start(now.date()))
+        assert db_session.execute(text(f"SELECT count(*) FROM {name}")).scalar() == 1
+        assert db_session.execute(text("SELECT count(*) FROM activity_logs_default")).scalar() == 0
+        assert db_session.query(ActivityLog).count() == 1
+    finally:
+        db_session.rollback()
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE activity_logs"))
+        ActivityLog.__table__.create(engine)
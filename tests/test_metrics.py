@@ -0,0 +1,14 @@
+def test_server_timing_and_prometheus_metrics(client):
+    response = client.get("/")
+    assert response.headers["Server-Timing"].startswith('db;dur=0.0;desc="0 queries"')
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/"}' in metrics.text
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in metrics.text
+
+def test_metrics_require_token_when_configured(client, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics/pool", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics/pool", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
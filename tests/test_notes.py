@@ -0,0 +1,207 @@
+import pytest
+
+def test_get_notes_paginated(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(3):
+        client.post("/notes/", json={"title": f"Note {i}", "content": "Some content"}, headers=headers)
+    first = client.get("/notes/?limit=2", headers=headers)
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    second = client.get("/notes/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}, headers=headers)
+    assert second.status_code == 200
+    first_ids = {note["id"] for note in first.json()}
+    assert all(note["id"] not in first_ids for note in second.json())
+
+def test_get_notes_pages_merge_owned_and_shared(client, db_session, test_user):
+    from datetime import datetime, timedelta
+    from app.models.note import Note as NoteModel
+    from app.models.user import User
+    other = User(username="other", email="other@example.com", hashed_password="x")
+    db_session.add(other)
+    db_session.flush()
+    start = datetime(2026, 1, 1)
+    notes = [NoteModel(title=f"N{i}", content="c", owner_id=(test_user.id if i % 2 else other.id),
+                       created_at=start, updated_at=start + timedelta(minutes=i)) for i in range(7)]
+    db_session.add_all(notes)
+    db_session.flush()
+    notes[0].collaborators.append(test_user)  # other's notes 0, 2 and 4 are shared; 6 is not
+    notes[2].collaborators.append(test_user)
+    notes[4].collaborators.append(test_user)
+    db_session.commit()
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    seen, cursor = [], None
+    while True:
+        page = client.get("/notes/", params={"limit": 2, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        seen += [note["title"] for note in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == ["N5", "N4", "N3", "N2", "N1", "N0"]
+
+def test_get_notes_summary_view(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/notes/?view=summary", headers=headers)
+    assert response.status_code == 200
+    assert all("content" not in note and "preview" in note for note in response.json())
+
+def test_get_notes_invalid_cursor(client, db_session, test_user):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/notes/?cursor=not-a-cursor", headers=headers)
+    assert response.status_code == 400
+
+def test_batch_notes(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post("/notes/batch", json={
+        "create": [{"title": "A", "content": "a"}, {"title": "B", "content": "b"}],
+        "update": [{"id": test_note.id, "title": "Updated", "content": "Updated content"}, {"id": 999999, "title": "X", "content": "x"}],
+    }, headers=headers)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [201, 201, 200, 404]
+    created_ids = [result["id"] for result in results if result["op"] == "create"]
+    ids = ",".join(str(note_id) for note_id in created_ids + [test_note.id])
+    notes = client.get(f"/notes/?ids={ids}", headers=headers).json()
+    assert {note["id"] for note in notes} == set(created_ids) | {test_note.id}
+    assert next(note for note in notes if note["id"] == test_note.id)["title"] == "Updated"
+    # test_note has the batch update's "edit" log row, which must go with it
+    response = client.post("/notes/batch", json={"delete": created_ids + [test_note.id]}, headers=headers)
+    assert [result["status"] for result in response.json()["results"]] == [200, 200, 200]
+    from app.models.activity_log import ActivityLog
+    assert db_session.query(ActivityLog).filter(ActivityLog.note_id == test_note.id).count() == 0
+
+def test_note_conditional_requests(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    etag = client.get(f"/notes/{test_note.id}", headers=headers).headers["ETag"]
+    response = client.get(f"/notes/{test_note.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    response = client.put(f"/notes/{test_note.id}", json={"title": "A", "content": "a"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    response = client.put(f"/notes/{test_note.id}", json={"title": "B", "content": "b"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 412
+
+def test_export_import_round_trip(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.put(f"/notes/{test_note.id}", json={"title": "Test Note", "content": "Edited"}, headers=headers)
+    export = client.get("/notes/export", headers=headers)
+    assert export.status_code == 200
+    records = [line for line in export.text.splitlines() if line]
+    response = client.post("/notes/import", content=export.content, headers=headers)
+    assert response.status_code == 201
+    assert response.json()["notes"] == sum('"type":"note"' in line for line in records)
+    assert response.json()["versions"] == sum('"type":"version"' in line for line in records)
+    response = client.post("/notes/import", content=b"not json\n", headers=headers)
+    assert response.status_code == 400
+
+def test_import_credits_rows_to_the_importer(client, db_session, test_user):
+    import json
+    from app.models.activity_log import ActivityLog
+    from app.models.user import User
+    from app.models.version import Version
+    other = User(username="other", email="other@example.com", hashed_password="x")
+    db_session.add(other)
+    db_session.commit()
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    lines = [{"type": "note", "id": 1, "title": "T", "content": "c", "version_count": 1},
+             {"type": "version", "note_id": 1, "version_number": 1, "content": "c", "editor_id": other.id},
+             {"type": "log", "note_id": 1, "user_id": other.id, "action": "edit"}]
+    response = client.post("/notes/import", content="\n".join(json.dumps(line) for line in lines).encode(), headers=headers)
+    assert response.status_code == 201
+    assert db_session.query(Version).filter(Version.editor_id == other.id).count() == 0
+    assert db_session.query(ActivityLog).filter(ActivityLog.user_id == other.id).count() == 0
+
+def test_import_limits_line_and_decompressed_size(client, db_session, test_user, monkeypatch):
+    import gzip
+    from app.config import settings
+    monkeypatch.setattr(settings, "import_max_line_bytes", 1000)
+    monkeypatch.setattr(settings, "import_max_bytes", 100_000)
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert client.post("/notes/import", content=b"x" * 5000, headers=headers).status_code == 413
+    bomb = gzip.compress(b"\n" * 10_000_000)  # ~10 KB that inflates to 10 MB
+    assert client.post("/notes/import", content=bomb, headers=headers).status_code == 413
+
+def test_get_note_query_budget(client, db_session, test_user, test_note, capture_queries):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    client.get(f"/notes/{test_note.id}", headers=headers)
+    with capture_queries() as queries:
+        response = client.get(f"/notes/{test_note.id}", headers=headers)
+    assert response.status_code == 200
+    assert queries.count <= 2
+
+def test_sized_lru_cache_evicts_by_bytes():
+    from app.utils.cache import SizedLRUCache
+    cache = SizedLRUCache(10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.get("a")
+    cache.set("c", b"1234")
+    assert cache.get("b") is None and cache.get("a") == b"1234"
+    cache.set("d", b"x" * 11)  # larger than the whole cache
+    assert cache.get("d") is None and cache.bytes == 8
+
+def test_note_read_cache_invalidated_on_update(client, db_session, test_user, test_note, capture_queries, monkeypatch):
+    from app.utils.read_cache import MemoryClient, RedisBackend, note_key, read_cache
+    monkeypatch.setattr(read_cache, "backend", RedisBackend(MemoryClient(), ttl=60))
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    first = client.get(f"/notes/{test_note.id}", headers=headers)
+    with capture_queries() as queries:
+        cached = client.get(f"/notes/{test_note.id}", headers=headers)
+    assert cached.json() == first.json() and cached.headers["ETag"] == first.headers["ETag"]
+    assert queries.count == 1  # the metadata revalidation; no row load
+    client.put(f"/notes/{test_note.id}", json={"title": "New", "content": "Changed"}, headers=headers)
+    assert client.get(f"/notes/{test_note.id}", headers=headers).json()["content"] == "Changed"
+    # a write whose invalidation was lost is not served either
+    read_cache.set(note_key(test_note.id), first.headers["ETag"], first.content)
+    assert client.get(f"/notes/{test_note.id}", headers=headers).json()["content"] == "Changed"
+
+def test_rapid_edits_coalesce_into_one_version(client, db_session, test_user, test_note, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "edit_coalesce_window", 30.0)
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    for i in range(5):
+        response = client.put(f"/notes/{test_note.id}", json={"title": "Test Note", "content": f"draft {i}"}, headers=headers)
+        assert response.status_code == 200
+    versions = client.get(f"/versions/{test_note.id}", params={"content": "true"}, headers=headers).json()
+    assert [version["content_snapshot"] for version in versions] == ["Test content"]
+    assert client.get(f"/notes/{test_note.id}", headers=headers).json()["content"] == "draft 4"
+    logs = client.get(f"/notes/{test_note.id}/logs", headers=headers).json()
+    assert [log["action"] for log in logs if log["action"] == "edit"] == ["edit"]
+
+def test_blank_title_is_a_validation_error(client):
+    from app.auth.jwt import create_access_token
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'testuser', 'uid': 1})}"}
+    response = client.post("/notes/", json={"title": " ", "content": "text"}, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["errors"][0]["msg"] == "Value error, Field must not be empty"
+
+def test_if_match_writes_succeed_with_coalescing_enabled(client, db_session, test_user, test_note, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "edit_coalesce_window", 30.0)
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    for content in ("first", "second"):  # a versioned edit, then one coalesced into it
+        etag = client.get(f"/notes/{test_note.id}", headers=headers).headers["ETag"]
+        response = client.put(f"/notes/{test_note.id}", json={"title": "Test Note", "content": content}, headers={**headers, "If-Match": etag})
+        assert response.status_code == 200
+    etag = client.get(f"/notes/{test_note.id}", headers=headers).headers["ETag"]
+    response = client.post(f"/versions/{test_note.id}/restore/1", headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+    assert client.get(f"/notes/{test_note.id}", headers=headers).json()["content"] == "Test content"
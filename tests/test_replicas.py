@@ -0,0 +1,26 @@
+from sqlalchemy import select, update
+from app.config import settings
+from app.database import SessionLocal, get_engine
+from app.models.note import Note
+from app.utils.replicas import ReplicaSet
+
+def test_reads_go_to_a_healthy_replica_except_after_a_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_replica_urls", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(settings, "replica_read_your_writes", 30.0)
+    replicas = ReplicaSet()
+    assert replicas.engine_for(1) is None  # not checked yet
+    replicas.check()
+    replica = replicas.engine_for(1)
+    assert replica is replicas.replicas[0].engine()
+
+    db = SessionLocal()
+    db.info["replica"] = replica
+    assert db.get_bind(clause=select(Note.id)) is replica
+    assert db.get_bind(clause=update(Note).values(title="x")) is get_engine()
+    db.close()
+
+    replicas.wrote(1)
+    assert replicas.engine_for(1) is None
+    assert replicas.engine_for(2) is replica
+    replicas.replicas[0].healthy = False
+    assert replicas.engine_for(2) is None
@@ -18,4 +18,32 @@ def test_search_notes_no_results(client, db_session, test_user):
 
 def test_search_notes_unauthorized(client):
     response = client.get("/notes/search?query=test")
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_search_notes_pagination(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(3):
+        client.post("/notes/", json={"title": f"Paged test {i}", "content": "test content"}, headers=headers)
+    first = client.get("/notes/search?query=test&limit=2", headers=headers)
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/notes/search", params={"query": "test", "limit": 2, "cursor": cursor}, headers=headers)
+    assert second.status_code == 200
+    first_ids = {note["id"] for note in first.json()}
+    assert all(note["id"] not in first_ids for note in second.json())
+    assert all("snippet" in note for note in first.json())
+
+def test_search_notes_like_fallback(client, db_session, test_user, test_note):
+    from app.utils.search import _search_like
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    for title in ("Fallback test 1", "Fallback test 2", "Fallback 100%"):
+        client.post("/notes/", json={"title": title, "content": "body"}, headers=headers)
+    first, cursor = _search_like(db_session, test_user.id, "fallback test", 1, None)
+    second, last = _search_like(db_session, test_user.id, "fallback test", 1, cursor)
+    assert [row["title"] for row in first + second] == ["Fallback test 2", "Fallback test 1"]
+    assert last is None
+    assert [row["title"] for row in _search_like(db_session, test_user.id, "0%", 10, None)[0]] == ["Fallback 100%"]
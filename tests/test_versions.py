@@ -0,0 +1,107 @@
+import pytest
+from app.utils.versioning import make_delta, apply_delta
+
+def test_delta_round_trip():
+    base = "first line\nsecond line\nthird line\n"
+    target = "first line\nchanged line\nthird line\nfourth line"
+    assert apply_delta(base, make_delta(base, target)) == target
+
+def test_get_version_content_after_edits(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    contents = ["Test content"]
+    for i in range(5):
+        contents.append(f"Test content\nedit {i}")
+        client.put(f"/notes/{test_note.id}", json={"title": "Test Note", "content": contents[-1]}, headers=headers)
+    for number in range(1, 6):
+        response = client.get(f"/versions/{test_note.id}/{number}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["content_snapshot"] == contents[number - 1]
+
+def test_version_numbers_follow_note_counter(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.put(f"/notes/{test_note.id}", json={"title": "Test Note", "content": "one"}, headers=headers)
+    client.put(f"/notes/{test_note.id}", json={"title": "Test Note", "content": "two"}, headers=headers)
+    client.post(f"/versions/{test_note.id}/restore/1", headers=headers)
+    numbers = [version["version_number"] for version in client.get(f"/versions/{test_note.id}", headers=headers).json()]
+    assert numbers == [1, 2, 3]
+
+def test_diff_only_returns_changed_hunks():
+    from app.utils.diff import diff_texts, unified
+    old = "\n".join(f"line {i}" for i in range(100))
+    new = old.replace("line 50", "line fifty")
+    diff = diff_texts(old, new, "word", context=1)
+    assert (diff["added"], diff["removed"]) == (1, 1)
+    [hunk] = diff["hunks"]
+    assert [row["op"] for row in hunk["rows"]] == ["equal", "replace", "equal"]
+    assert {"op": "insert", "text": "fifty"} in hunk["rows"][1]["right"]["segments"]
+    assert unified(diff, "v1", "v2").splitlines()[2:] == ["@@ -50,3 +50,3 @@", " line 49", "-line 50", "+line fifty", " line 51"]
+
+def test_version_history_is_metadata_only_and_paginated(client, db_session, test_user, test_note):
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    for i in range(5):
+        client.put(f"/notes/{test_note.id}", json={"title": "Test Note", "content": f"edit {i}"}, headers=headers)
+    first = client.get(f"/versions/{test_note.id}", params={"limit": 3}, headers=headers)
+    assert [version["version_number"] for version in first.json()] == [1, 2, 3]
+    assert all("content_snapshot" not in version for version in first.json())
+    rest = client.get(f"/versions/{test_note.id}", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]}, headers=headers)
+    assert [version["version_number"] for version in rest.json()] == [4, 5]
+    assert "X-Next-Cursor" not in rest.headers
+    expanded = client.get(f"/versions/{test_note.id}", params={"from": 2, "to": 3, "content": "true"}, headers=headers)
+    assert [version["content_snapshot"] for version in expanded.json()] == ["edit 0", "edit 1"]
+
+def test_compaction_keeps_remaining_versions_decodable(db_session, test_user, monkeypatch):
+    from datetime import datetime, timedelta
+    from app.config import settings
+    from app.models.note import Note
+    from app.models.version import Version
+    from app.utils import versioning
+    from app.utils.version_retention import compact_note
+    monkeypatch.setattr(settings, "version_keep_last", 3)
+    monkeypatch.setattr(settings, "version_keyframe_interval", 4)
+    now = datetime.utcnow()
+    note = Note(title="t", content="", owner_id=test_user.id)
+    db_session.add(note)
+    db_session.commit()
+    contents = {number: "\n".join(f"line {i}" for i in range(number)) for number in range(1, 31)}
+    for number, content in contents.items():
+        version = versioning.add_version(db_session, note.id, number, content, test_user.id)
+        version.timestamp = now - timedelta(hours=(30 - number) * 6)
+        db_session.commit()
+    result = compact_note(db_session, note.id, now)
+    db_session.commit()
+    assert result["removed"] > 0
+    versioning.forget_note(note.id)
+    kept = db_session.query(Version).filter(Version.note_id == note.id).order_by(Version.version_number).all()
+    assert len(kept) == 30 - result["removed"]
+    assert all(versioning.get_content(db_session, version) == contents[version.version_number] for version in kept)
+    assert db_session.get(Note, note.id).history_pruned == result["removed"]
+
+def test_versions_compacted_by_another_worker_are_not_served_from_cache(client, db_session, test_user, monkeypatch):
+    from datetime import datetime, timedelta
+    from app.config import settings
+    from app.models.note import Note
+    from app.utils import versioning
+    from app.utils.version_retention import compact_note
+    monkeypatch.setattr(settings, "version_keep_last", 1)
+    now = datetime.utcnow()
+    note = Note(title="t", content="", owner_id=test_user.id)
+    db_session.add(note)
+    db_session.commit()
+    for number in range(1, 5):
+        version = versioning.add_version(db_session, note.id, number, f"content {number}", test_user.id)
+        version.timestamp = now - timedelta(minutes=number)  # all in one hour: only the newest is kept
+        db_session.commit()
+    login = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert client.get(f"/versions/{note.id}/1", headers=headers).status_code == 200
+    assert client.get(f"/versions/{note.id}/diff", params={"from": 1, "to": 2}, headers=headers).status_code == 200
+    # Compacted as another worker would: this worker's caches are not told
+    assert compact_note(db_session, note.id, now)["removed"] > 0
+    db_session.commit()
+    assert client.get(f"/versions/{note.id}/1", headers=headers).status_code == 404
+    assert client.get(f"/versions/{note.id}/diff", params={"from": 1, "to": 2}, headers=headers).status_code == 404